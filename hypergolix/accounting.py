@@ -179,7 +179,7 @@ class Account(metaclass=API):
         await self._salmonator.attempt_pull(gao.ghid, quiet=True)
         gao._ctx = asyncio.Event()
         gao._ctx.set()
-        self._oracle._lookup[gao.ghid] = gao
+        self._oracle._remember(gao.ghid, gao)
             
     async def bootstrap(self):
         ''' Used for account creation, to initialize the root node with
@@ -46,6 +46,30 @@ from hypergolix.daemon import stop as stop_app
 
 from hypergolix.config import handle_args as config
 from hypergolix.config import NAMED_REMOTES
+from hypergolix.config import convert_remote
+
+
+# ###############################################
+# Argparse helpers
+# ###############################################
+
+
+class _AppendRemoteAction(argparse.Action):
+    ''' Appends a remote, type casting it into a Remote during parsing
+    so that argparse reports the offending token. Works for named
+    remotes as well as manually-defined hosts, with or without TLS.
+    '''
+    
+    def __call__(self, parser, namespace, values, option_string=None):
+        try:
+            remote = convert_remote(values)
+        except ValueError as exc:
+            raise argparse.ArgumentError(self, str(exc)) from exc
+        
+        # Copy instead of appending in place, since the default list is shared
+        remotes = list(getattr(namespace, self.dest, None) or [])
+        remotes.append(remote)
+        setattr(namespace, self.dest, remotes)
 
 
 # ###############################################
@@ -267,7 +291,7 @@ remote_group.add_argument(
 # Auto-add
 remote_group.add_argument(
     '--add', '-a',
-    action = 'append',
+    action = _AppendRemoteAction,
     type = str,
     help = 'Add a named remote to the Hypergolix configuration. Cannot ' +
            'be combined with --only.',
@@ -278,7 +302,7 @@ remote_group.add_argument(
 # Auto-remove
 remote_group.add_argument(
     '--remove', '-r',
-    action = 'append',
+    action = _AppendRemoteAction,
     type = str,
     help = 'Remove a named remote from the Hypergolix configuration. ' +
            'Cannot be combined with --only.',
@@ -289,7 +313,7 @@ remote_group.add_argument(
 # Manually add a host
 remote_group.add_argument(
     '--addhost', '-ah',
-    action = 'append',
+    action = _AppendRemoteAction,
     type = str,
     help = 'Add a remote host, of form "hostname port use_TLS". Example ' +
            'usage: "hypergolix.config --adhost 192.168.0.1 7770 False". ' +
@@ -302,7 +326,7 @@ remote_group.add_argument(
 # Manually remove a host
 remote_group.add_argument(
     '--removehost', '-rh',
-    action = 'append',
+    action = _AppendRemoteAction,
     type = str,
     help = 'Remove a remote host, of form "hostname port". Example ' +
            'usage: "hypergolix.config --removehost 192.168.0.1 7770". ' +
@@ -33,7 +33,6 @@ hypergolix: A python Golix client.
 import logging
 import asyncio
 import websockets
-import traceback
 import weakref
 import base64
 import loopa
@@ -61,7 +60,6 @@ from .exceptions import RequestUnknown
 from .exceptions import ConnectionClosed
 from .exceptions import ProtocolVersionError
 
-from .utils import _BijectDict
 from .utils import ensure_equal_len
 
 
@@ -246,7 +244,8 @@ class _ConnectionBase(metaclass=API):
             except Exception:
                 logger.error(
                     'CONN ' + str(self) + ' Listener receiver ' +
-                    'raised w/ traceback:\n' + ''.join(traceback.format_exc())
+                    'raised w/ traceback:',
+                    exc_info=True
                 )
                 raise
                 
@@ -398,8 +397,8 @@ class WSConnection(_ConnectionBase):
             
         except Exception as exc:
             logger.error(
-                'INTERNAL SERVER ERROR. Closing server w/ traceback:\n' +
-                ''.join(traceback.format_exc())
+                'INTERNAL SERVER ERROR. Closing server w/ traceback:',
+                exc_info=True
             )
             logger.debug('Error args:' + str(exc.args))
         
@@ -562,7 +561,7 @@ class MsgBuffer(loopa.TaskLooper):
         # Very quick and easy way of injecting all of the handler methods into
         # self. Short of having one queue per method, we need to wrap it
         # anyways to buffer the actual method call.
-        for name in handler._RESPONDERS:
+        for name in handler._RESPONDERS.values():
             async def wrap_request(*args, _wrapped_name=name, **kwargs):
                 await self._send_q.put((_wrapped_name, args, kwargs))
             setattr(self, name, wrap_request)
@@ -616,8 +615,8 @@ class MsgBuffer(loopa.TaskLooper):
         
         except Exception:
             logger.error(
-                'MsgBuffer raised while handling task w/ traceback:\n' +
-                ''.join(traceback.format_exc())
+                'MsgBuffer raised while handling task w/ traceback:',
+                exc_info=True
             )
         
     async def loop_stop(self):
@@ -675,7 +674,7 @@ class ConnectionManager(loopa.TaskLooper, metaclass=loopa.utils.Triplicate):
         # Very quick and easy way of injecting all of the handler methods into
         # self. Short of having one queue per method, we need to wrap it
         # anyways to buffer the actual method call.
-        for name in msg_handler._RESPONDERS:
+        for name in msg_handler._RESPONDERS.values():
             async def wrap_request(*args, _method=name, **kwargs):
                 ''' Pass all requests to our perform_request method.
                 '''
@@ -739,8 +738,7 @@ class ConnectionManager(loopa.TaskLooper, metaclass=loopa.utils.Triplicate):
         except Exception as exc:
             logger.error('Failed to establish connection at ' +
                          self._conn_desc)
-            logger.info('Failed connection traceback:\n' +
-                        ''.join(traceback.format_exc()))
+            logger.info('Failed connection traceback:', exc_info=True)
             # Do this first, because otherwise randrange errors (and also
             # otherwise it isn't technically binary exponential backoff)
             self._consecutive_attempts += 1
@@ -782,8 +780,8 @@ class ConnectionManager(loopa.TaskLooper, metaclass=loopa.utils.Triplicate):
             # connections.
             except ConnectionError:
                 logger.warning('Connection errored: ' + self._conn_desc +
-                               ' w/ traceback:\n' +
-                               ''.join(traceback.format_exc()))
+                               ' w/ traceback:',
+                               exc_info=True)
             
             # No matter what happens, when this dies we need to clean up the
             # connection and tell downstream that we cannot send anymore.
@@ -890,11 +888,21 @@ class RequestResponseProtocol(type):
         )
         
         # As do all of the error codes
-        error_codes = _BijectDict(error_codes)
+        error_types = dict(error_codes)
         error_code_len = ensure_equal_len(
-            error_codes,
+            error_types,
             msg = 'Inconsistent error code length.'
         )
+        # Failures are packed by exception type and unpacked by code, so keep
+        # a plain dict for each direction.
+        error_codes = {exc: code for code, exc in error_types.items()}
+        if len(error_codes) != len(error_types):
+            raise ValueError('Error codes must map to unique exceptions.')
+        
+        # Lookup: request code -> request attr name
+        responders = {code: name for name, code in req_defs.items()}
+        if len(responders) != len(req_defs):
+            raise ValueError('Protocols cannot reuse request codes.')
         
         # Create the class
         cls = super().__new__(mcls, clsname, bases, namespace, *args, **kwargs)
@@ -905,15 +913,19 @@ class RequestResponseProtocol(type):
         
         # Add any and all error codes as a class attr
         cls._ERROR_CODES = error_codes
+        cls._ERROR_TYPES = error_types
         cls._ERROR_CODE_LEN = error_code_len
         
         # Add the success code and failure code
         cls._MSG_CODE_LEN = msg_code_len
         cls._SUCCESS_CODE = success_code
         cls._FAILURE_CODE = failure_code
+        # Lookup: response code -> did the request succeed? Anything missing
+        # from this is a request, so incoming dispatch is a single dict probe.
+        cls._RESPONSE_CODES = {success_code: True, failure_code: False}
         
-        # Support bidirectional lookup for request code <--> request attr name
-        cls._RESPONDERS = _BijectDict(req_defs)
+        # Add the request code -> request attr name lookup
+        cls._RESPONDERS = responders
         
         # Now do anything else we need to modify the thingajobber
         return cls
@@ -1079,7 +1091,7 @@ class _ReqResMixin:
     def __init__(self, *args, **kwargs):
         ''' Add in a weakkeydictionary to track connection responses.
         '''
-        # Lookup: connection -> {token1: queue1, token2: queue2...}
+        # Lookup: connection -> {token1: future1, token2: future2...}
         self._responses = weakref.WeakKeyDictionary()
         super().__init__(*args, **kwargs)
         
@@ -1109,26 +1121,28 @@ class _ReqResMixin:
             
         # This block dispatches the call. We handle **everything** within this
         # coroutine, so it could be an ACK or a NAK as well as a request.
-        if code == self._SUCCESS_CODE:
+        succeeded = self._RESPONSE_CODES.get(code)
+        
+        # Not a response code, so handle a new request then.
+        if succeeded is None:
+            logger.debug(msg_id + ' starting.')
+            await self.handle_request(connection, code, token, body)
+            # Important to avoid trying to awaken a pending response
+            return
+            
+        elif succeeded:
             logger.debug(
                 msg_id + ' SUCCESS received w/ partial body: ' + str(body[:10])
             )
             response = (body, None)
             
         # For failures, result=None and failure=Exception()
-        elif code == self._FAILURE_CODE:
+        else:
             logger.debug(
                 msg_id + ' FAILURE received w/ partial body: ' + str(body[:10])
             )
             response = (None, self._unpack_failure(body))
             
-        # Handle a new request then.
-        else:
-            logger.debug(msg_id + ' starting.')
-            await self.handle_request(connection, code, token, body)
-            # Important to avoid trying to awaken a pending response
-            return
-            
         # We arrive here only by way of a response (and not a request), so we
         # need to awaken the requestor.
         self._ensure_responseable(connection)
@@ -1141,9 +1155,14 @@ class _ReqResMixin:
             logger.debug(msg_id + ' code: ' + str(code))
             logger.debug(msg_id + ' body: ' + str(body[:50]))
         
+        # The requestor may have been cancelled out from under us, in which
+        # case there's nobody left to wake.
+        elif waiter.done():
+            logger.debug(msg_id + ' requestor already finished.')
+            
         else:
             logger.debug(msg_id + ' waking sender...')
-            await waiter.put(response)
+            waiter.set_result(response)
         
     async def packit(self, code, token, body):
         ''' Serialize a message.
@@ -1199,8 +1218,8 @@ class _ReqResMixin:
         except KeyError:
             result = self._pack_failure(RequestUnknown(repr(code)))
             logger.warning(
-                req_id + ' FAILED w/ traceback:\n' +
-                ''.join(traceback.format_exc())
+                req_id + ' FAILED w/ traceback:',
+                exc_info=True
             )
             response = await self.packit(
                 self._FAILURE_CODE,
@@ -1225,8 +1244,8 @@ class _ReqResMixin:
             except Exception as exc:
                 result = self._pack_failure(exc)
                 logger.warning(
-                    req_id + ' FAILED w/ traceback:\n' +
-                    ''.join(traceback.format_exc())
+                    req_id + ' FAILED w/ traceback:',
+                    exc_info=True
                 )
                 response = await self.packit(
                     self._FAILURE_CODE,
@@ -1252,8 +1271,8 @@ class _ReqResMixin:
         # Unsuccessful. Log the failure.
         except Exception:
             logger.error(
-                req_id + ' FAILED TO SEND RESPONSE w/ traceback:\n' +
-                ''.join(traceback.format_exc())
+                req_id + ' FAILED TO SEND RESPONSE w/ traceback:',
+                exc_info=True
             )
         
         else:
@@ -1304,7 +1323,7 @@ class _ReqResMixin:
                 error_code = body[:self._ERROR_CODE_LEN]
                 error_msg = str(body[self._ERROR_CODE_LEN:], 'utf-8')
                 
-                result = self._ERROR_CODES[error_code](error_msg)
+                result = self._ERROR_TYPES[error_code](error_msg)
                 
             except KeyError:
                 logger.warning(
@@ -1320,8 +1339,8 @@ class _ReqResMixin:
                 
             except Exception:
                 logger.warning(
-                    'Improper NAK body: ' + str(body) + ' w/ traceback:\n' +
-                    ''.join(traceback.format_exc())
+                    'Improper NAK body: ' + str(body) + ' w/ traceback:',
+                    exc_info=True
                 )
                 result = RequestError(str(body))
             
@@ -1346,11 +1365,10 @@ class _ReqResMixin:
         # Pack the request
         request = await self.packit(code, token, body)
         
-        # With all of that successful, create a queue for the response, send
-        # the request, and then await the response.
-        waiter = asyncio.Queue(maxsize=1)
+        # With all of that successful, grab the future we reserved alongside
+        # the token, send the request, and then await the response.
+        waiter = self._responses[connection][token]
         try:
-            self._responses[connection][token] = waiter
             # For diagnostic purposes (and because it's negligently expensive),
             # time the duration of the request.
             start = time.monotonic()
@@ -1359,7 +1377,7 @@ class _ReqResMixin:
             
             # Wait for the response
             try:
-                response, exc = await asyncio.wait_for(waiter.get(), timeout)
+                response, exc = await asyncio.wait_for(waiter, timeout)
                 
             except asyncio.TimeoutError:
                 logger.warning(msg_id + ' timed out.')
@@ -1422,7 +1440,7 @@ class _ReqResMixin:
         while token in self._responses[connection]:
             token = random.getrandbits(16)
         token = _RequestToken(token)
-        # Now create an empty entry in the _responses entry (to avoid a race
-        # condition) and return the token
-        self._responses[connection][token] = None
+        # Now reserve the token with the future its response will be delivered
+        # to (to avoid a race condition) and return the token
+        self._responses[connection][token] = asyncio.Future()
         return token
@@ -28,16 +28,30 @@ hypergolix: A python Golix client.
     Boston, MA  02110-1301 USA
 
 ------------------------------------------------------
+
+Some notes:
+
++   Parsed configs are cached next to the config file, in a json
+    sidecar named "<config name>.cache.json", so that new processes
+    can skip the (slow) yaml parse. The sidecar is keyed on the
+    config's mtime and size, and holds a full copy of the config --
+    root secret included. It's therefore written with the config's own
+    permissions (and, where possible, owner), is only ever (re)written
+    when it's missing or stale, and follows the config if it's
+    renamed. Configs json can't faithfully represent never get one.
+    Deleting it is always safe.
+
 '''
 
 # Global dependencies
 import pathlib
 import collections
-import copy
-import webbrowser
-import yaml
-import inspect
+import functools
+import operator
 import os
+import stat
+import sys
+import tempfile
 import warnings
 
 from golix import Ghid
@@ -87,19 +101,402 @@ def _yaml_caster(loader, data):
     return loader.represent_mapping('tag:yaml.org,2002:map', data.items())
     
     
-yaml.add_representer(collections.OrderedDict, _yaml_caster)
+# yaml is expensive to import, so defer it until the first time it's needed.
+# Once loaded, this is (yaml, loader class, dumper class).
+_YAML = None
+
+
+def _get_yaml():
+    ''' Import yaml (if we haven't already), selecting the loader and
+    dumper to use and registering our OrderedDict representer.
+    '''
+    global _YAML
+    
+    if _YAML is None:
+        import yaml
+        
+        # Prefer the libyaml-backed loader and dumper, but fall back to the
+        # pure-python ones if pyyaml was built without libyaml.
+        try:
+            from yaml import CSafeLoader as loader
+            from yaml import CSafeDumper as dumper
+        except ImportError:
+            from yaml import SafeLoader as loader
+            from yaml import SafeDumper as dumper
+        
+        yaml.add_representer(collections.OrderedDict, _yaml_caster,
+                             Dumper=dumper)
+        _YAML = (yaml, loader, dumper)
+    
+    return _YAML
+
+
+# Same deal for json-formatted configs: use orjson if it's installed.
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Only used for the cache sidecar, which needs str output
+from json import dumps as _json_dumps
+
+
+def _parse_cfg(data):
+    ''' Parse config text into its natively deserialized form.
+    
+    NOTE: json is valid yaml. This will correctly load old configs
+    without any extra effort! But the json parser is much faster, so
+    try it first for anything that looks like json (old configs are
+    always a single object), and fall back to yaml if it fails.
+    '''
+    if data.lstrip()[:1] == '{':
+        try:
+            return _json_loads(data)
+        except ValueError:
+            pass
+    
+    yaml, loader, dumper = _get_yaml()
+    return yaml.load(data, Loader=loader)
+
+
+def _serialize_cfg(raw_cfg):
+    ''' Serialize a natively serializable config into yaml text.
+    '''
+    yaml, loader, dumper = _get_yaml()
+    return yaml.dump(raw_cfg, Dumper=dumper, default_flow_style=False)
+
+
+# Lookup: absolute path -> (mtime_ns, size, parsed config, config text)
+_CFG_CACHE = {}
+
+
+def _cached_cfg(path, stat):
+    ''' Return the cache entry for path if it's still fresh, otherwise
+    None.
+    '''
+    try:
+        mtime, size, raw_cfg, text = _CFG_CACHE[path]
+    except KeyError:
+        return None
+    
+    if mtime == stat.st_mtime_ns and size == stat.st_size:
+        return raw_cfg, text
+    else:
+        return None
+
+
+def _sidecar_path(path):
+    ''' Get the path to the json cache sidecar for the config at path.
+    '''
+    return path.with_name(path.name + '.cache.json')
+
+
+def _read_sidecar(path, stat):
+    ''' Load the (parsed config, config text) pair from path's sidecar,
+    if the sidecar was written for the current version of the config.
+    Otherwise, return None.
+    '''
+    try:
+        sidecar = _json_loads(_read_utf8(_sidecar_path(path)))
+        if sidecar['key'] == [stat.st_mtime_ns, stat.st_size]:
+            return sidecar['cfg'], sidecar['text']
+    
+    # Missing, unreadable, or mangled sidecars are just cache misses.
+    except (OSError, ValueError, LookupError, TypeError):
+        pass
+    
+    return None
+
+
+def _write_sidecar(path, stat, raw_cfg, text):
+    ''' Cache the parsed config next to path, so that the next process
+    to load it can skip yaml entirely. Stat is the config's stat result,
+    which both keys the sidecar and sets its permissions.
+    '''
+    try:
+        sidecar = _json_dumps({
+            'key': [stat.st_mtime_ns, stat.st_size],
+            'cfg': raw_cfg,
+            'text': text
+        })
+        
+        # Yaml can express things json can't (dates, binary, non-str keys,
+        # etc). Some of those json refuses outright; others it silently
+        # mangles, so only cache configs that survive the round trip intact.
+        if _json_loads(sidecar)['cfg'] != raw_cfg:
+            sidecar = None
+    
+    except (TypeError, ValueError):
+        sidecar = None
+    
+    if sidecar is None:
+        logger.debug('Config is not json-safe; skipping cache sidecar.')
+        # Don't leave an older copy of the config lying around, either.
+        # There usually won't be one, and it's stale regardless, so this
+        # can't fail the load.
+        try:
+            os.unlink(str(_sidecar_path(path)))
+        except OSError:
+            pass
+        return
+    
+    # The sidecar is purely an optimization, so never fail because of it.
+    try:
+        # The sidecar holds a full copy of the config, secrets and all, so
+        # it must be exactly as accessible as the config itself.
+        _atomic_write(_sidecar_path(path), sidecar, like=stat)
+        
+    except OSError:
+        logger.debug('Failed to write config cache sidecar.', exc_info=True)
+
+
+def _read_utf8(path):
+    ''' Read the whole file at path as utf-8 text, without going through
+    the io stack.
+    '''
+    # Str conversion for python 3.5 compatibility
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        data = os.read(fd, os.fstat(fd).st_size)
+        # Make sure we don't miss anything if the file grew in the meantime
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            data += chunk
+    
+    finally:
+        os.close(fd)
+        
+    return data.decode('utf-8')
+
+
+def _atomic_write(path, text, like=None):
+    ''' Write text to path via a sibling tempfile that is then renamed
+    over the original, so a crash partway through never leaves a torn
+    file behind. Since configs hold secrets, new files are user-only;
+    existing files keep their mode (and, where possible, their owner).
+    Pass a stat result as like to copy those from some other file.
+    '''
+    data = text.encode('utf-8')
+    # Str conversion for python 3.5 compatibility
+    fd, tmp_path = tempfile.mkstemp(
+        prefix = '.' + path.name + '.',
+        suffix = '.tmp',
+        dir = str(path.parent)
+    )
+    
+    try:
+        try:
+            if like is None:
+                try:
+                    like = os.stat(str(path))
+                except FileNotFoundError:
+                    pass
+            
+            # mkstemp already made the file user-only, so this only
+            # ever needs to copy over an existing file's permissions.
+            if like is not None:
+                os.chmod(tmp_path, stat.S_IMODE(like.st_mode))
+                if hasattr(os, 'fchown'):
+                    try:
+                        os.fchown(fd, like.st_uid, like.st_gid)
+                    except PermissionError:
+                        pass
+            
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        
+        finally:
+            os.close(fd)
+        
+        os.replace(tmp_path, str(path))
+    
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_cfg(path):
+    ''' Read and parse the config at path, reusing the previous parse
+    if the file hasn't changed since then. Note that detranscoding never
+    mutates the parsed config, so it's safe to share.
+    '''
+    path = path.absolute()
+    stat = path.stat()
+    
+    cached = _cached_cfg(path, stat)
+    if cached is not None:
+        return cached[0]
+    
+    cached = _read_sidecar(path, stat)
+    if cached is not None:
+        raw_cfg, text = cached
+    
+    # The sidecar is missing or stale, so this is the only time a plain
+    # load ever needs to (re)write it.
+    else:
+        text = _read_utf8(path)
+        raw_cfg = _parse_cfg(text)
+        _write_sidecar(path, stat, raw_cfg, text)
+    
+    _CFG_CACHE[path] = (stat.st_mtime_ns, stat.st_size, raw_cfg, text)
+    return raw_cfg
+
+
+def _write_cfg(path, raw_cfg):
+    ''' Serialize and write raw_cfg to path, priming the read cache (and
+    its sidecar) with it so that the next load doesn't need to parse
+    what we just wrote. If the file already holds exactly this text, it
+    isn't touched.
+    '''
+    path = path.absolute()
+    text = _serialize_cfg(raw_cfg)
+    
+    try:
+        cached = _cached_cfg(path, path.stat())
+    except FileNotFoundError:
+        cached = None
+    
+    if cached is not None and cached[1] == text:
+        return
+    
+    # Don't leave a stale entry behind if the write fails partway through
+    _CFG_CACHE.pop(path, None)
+    _atomic_write(path, text)
+    
+    stat = path.stat()
+    _CFG_CACHE[path] = (stat.st_mtime_ns, stat.st_size, raw_cfg, text)
+    _write_sidecar(path, stat, raw_cfg, text)
+
+
+def _rename_cfg(old_path, new_path):
+    ''' Rename the config at old_path to new_path, taking its sidecar
+    (and its read cache entry) along with it.
+    '''
+    old_path = old_path.absolute()
+    new_path = new_path.absolute()
+    
+    old_path.rename(new_path)
+    _CFG_CACHE.pop(new_path, None)
+    cached = _CFG_CACHE.pop(old_path, None)
+    if cached is not None:
+        _CFG_CACHE[new_path] = cached
+    
+    # Renaming preserves the mtime, so the sidecar stays fresh.
+    new_sidecar = str(_sidecar_path(new_path))
+    try:
+        os.replace(str(_sidecar_path(old_path)), new_sidecar)
+    
+    # If there's nothing to move, any sidecar already at the new name was
+    # for a config that just got replaced, so don't leave it lying around.
+    except FileNotFoundError:
+        try:
+            os.unlink(new_sidecar)
+        except FileNotFoundError:
+            pass
+
+
+def _anchor_default(root, default):
+    ''' Join relative default paths onto root; return anything else
+    untouched.
+    '''
+    if isinstance(default, pathlib.PurePath):
+        return root / default
+    else:
+        return default
+
+
+@functools.lru_cache(maxsize=8)
+def _search_order(envpath, appdatapath, cwd, home):
+    ''' Build the directories that Config.find searches, in order. These
+    only change with the environment, so cache them on it.
+    '''
+    return (
+        pathlib.Path(envpath),
+        pathlib.Path(cwd),
+        pathlib.Path(home) / '.hypergolix',
+        # It really doesn't matter if we do this on Windows too, since it'll
+        # just not exist.
+        pathlib.Path('/etc/hypergolix'),
+        pathlib.Path(appdatapath) / 'Hypergolix',
+    )
+
+
+# Lookup: tuple(search directories) -> path to the config found there
+_FIND_CACHE = {}
+
+
+def _find_cfg(search_order, fnames):
+    ''' Return the first config file in search_order, preferring fnames
+    in order within each directory, or None if there isn't one. Each
+    directory is listed once, instead of statting every candidate.
+    '''
+    for dirpath in search_order:
+        try:
+            # Str conversion for python 3.5 compatibility
+            names = set(os.listdir(str(dirpath)))
+        except OSError:
+            continue
+        
+        for fname in fnames:
+            if fname in names:
+                return dirpath / fname
+    
+    return None
 
 
 # ###############################################
 # Library
 # ###############################################
-            
 
-_readonly_remote = collections.namedtuple(
-    typename = 'Remote',
-    field_names = ('host', 'port', 'tls'),
-)
-        
+
+# Lookup: subfield class -> list subclass that only accepts its instances
+_LISTED_SUBFIELDS = {}
+
+
+def _make_listed(subfield):
+    ''' Get the type-checked list class for subfield, creating it if this
+    is the first listed AutoField to use it. Note that the type checks
+    are skipped entirely when running with -O.
+    '''
+    try:
+        return _LISTED_SUBFIELDS[subfield]
+    except KeyError:
+        pass
+    
+    class ListedSubfield(list):
+        ''' Well, this doesn't support slicing, but whatevs.
+        Or extension, for that matter.
+        '''
+        def __setitem__(instance, index, value, _setitem=list.__setitem__):
+            if __debug__ and not isinstance(value, subfield):
+                raise TypeError(value)
+            _setitem(instance, index, value)
+                
+        def append(instance, value, _append=list.append):
+            if __debug__ and not isinstance(value, subfield):
+                raise TypeError(value)
+            _append(instance, value)
+                
+        def extend(instance, value):
+            ''' Suppress extension, because it's messy.
+            '''
+            raise NotImplementedError()
+            
+        def insert(instance, index, value, _insert=list.insert):
+            if __debug__ and not isinstance(value, subfield):
+                raise TypeError(value)
+            _insert(instance, index, value)
+    
+    _LISTED_SUBFIELDS[subfield] = ListedSubfield
+    return ListedSubfield
+            
         
 class AutoField:
     ''' Helper class descriptor for AutoMappers.
@@ -110,125 +507,128 @@ class AutoField:
     def __init__(self, subfield=None, *args, listed=False, decode=None,
                  encode=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self._name = None
         self.subfield = subfield
         self._encode = encode
         self._decode = decode
         
         if listed:
             if subfield:
-                class ListedSubfield(list):
-                    ''' Well, this doesn't support slicing, but whatevs.
-                    Or extension, for that matter.
-                    '''
-                    def __setitem__(instance, index, value, subfield=subfield):
-                        if isinstance(value, subfield):
-                            super(ListedSubfield, instance).__setitem__(index,
-                                                                        value)
-                        else:
-                            raise TypeError(value)
-                            
-                    def append(instance, value, subfield=subfield):
-                        if isinstance(value, subfield):
-                            super(ListedSubfield, instance).append(value)
-                        else:
-                            raise TypeError(value)
-                            
-                    def extend(instance, value, subfield=subfield):
-                        ''' Suppress extension, because it's messy.
-                        '''
-                        raise NotImplementedError()
-                        
-                    def insert(instance, index, value, subfield=subfield):
-                        if isinstance(value, subfield):
-                            super(ListedSubfield, instance).insert(index,
-                                                                   value)
-                        else:
-                            raise TypeError(value)
-                            
-                self.listed = ListedSubfield
+                self.listed = _make_listed(subfield)
                 
             else:
                 self.listed = list
         
         else:
             self.listed = False
+            
+        # The encoding and decoding branches we take never change, so pick
+        # them once, up front, instead of re-checking on every call.
+        self.encode_single = self._select_encoder(subfield, encode)
+        self.decode_single = self._select_decoder(subfield, decode)
         
-    def encode(self, value):
-        ''' Wrap encode_single to support iteration.
-        '''
         if self.listed:
-            result = []
-            for item in value:
-                result.append(self.encode_single(item))
-                
-        else:
-            result = self.encode_single(value)
+            self.encode = self._encode_listed
+            self.decode = self._decode_listed
             
-        return result
-        
-    def encode_single(self, value):
-        if value is None:
-            return value
-        elif self.subfield is not None:
-            return value.entranscode()
-        elif self._encode is None:
-            return value
-        elif callable(self._encode):
-            return self._encode(value)
         else:
-            return getattr(value, self._encode)()
+            self.encode = self.encode_single
+            self.decode = self.decode_single
         
-    def decode(self, value):
-        ''' Wrap decode_single to support iteration.
+    @staticmethod
+    def _select_encoder(subfield, encode):
+        ''' Pick the function used to encode a single value.
         '''
-        if self.listed:
-            result = []
-            for item in value:
-                result.append(self.decode_single(item))
+        if subfield is not None:
+            def encode_single(value):
+                if value is None:
+                    return value
+                return value.entranscode()
+                
+        elif encode is None:
+            def encode_single(value):
+                return value
+                
+        elif callable(encode):
+            def encode_single(value):
+                if value is None:
+                    return value
+                return encode(value)
                 
         else:
-            result = self.decode_single(value)
+            # methodcaller does the attribute lookup and call in C
+            encode_method = operator.methodcaller(encode)
             
-        return result
+            def encode_single(value):
+                if value is None:
+                    return value
+                return encode_method(value)
+                
+        return encode_single
         
-    def decode_single(self, value):
-        if value is None:
-            return value
-        elif self.subfield is not None:
-            instance = self.subfield()
-            instance.detranscode(value)
-            return instance
-        elif self._decode is None:
-            return value
-        elif callable(self._decode):
-            return self._decode(value)
+    @staticmethod
+    def _select_decoder(subfield, decode):
+        ''' Pick the function used to decode a single value.
+        '''
+        if subfield is not None:
+            def decode_single(value):
+                if value is None:
+                    return value
+                instance = subfield()
+                instance.detranscode(value)
+                return instance
+                
+        elif decode is None:
+            def decode_single(value):
+                return value
+                
+        elif callable(decode):
+            def decode_single(value):
+                if value is None:
+                    return value
+                return decode(value)
+                
         else:
-            raise TypeError('Decoding must use a callable.')
+            def decode_single(value):
+                if value is None:
+                    return value
+                raise TypeError('Decoding must use a callable.')
+                
+        return decode_single
+        
+    def _encode_listed(self, value):
+        ''' Wrap encode_single to support iteration.
+        '''
+        encode_single = self.encode_single
+        return [encode_single(item) for item in value]
+        
+    def _decode_listed(self, value):
+        ''' Wrap decode_single to support iteration.
+        '''
+        decode_single = self.decode_single
+        return [decode_single(item) for item in value]
             
     @property
     def name(self):
         ''' Reading is trivial.
         '''
-        try:
-            return self._name
-        except AttributeError:
-            return None
+        return self._name
     
     @name.setter
     def name(self, value):
         ''' Writing checks to see if we have a value; if we do, it
         silently ignores the change.
         '''
-        if not hasattr(self, '_name'):
-            self._name = value
-        elif self._name is None:
+        if self._name is None:
             self._name = value
             
+    # Note that these all use self._name directly, instead of going through
+    # the property, since they're on the hot path for every field access.
     def __get__(self, instance, owner):
         if instance is None:
             return self
         else:
-            return instance._fields[self.name]
+            return instance._fields[self._name]
             
     def __set__(self, instance, value):
         ''' Set the value at the instance's _fields OrderedDict.
@@ -244,44 +644,42 @@ class AutoField:
                                  'of the subfield.')
         
         else:
-            instance._fields[self.name] = value
+            instance._fields[self._name] = value
         
     def __delete__(self, instance):
         ''' Set the value at the instance's _fields OrderedDict to None.
         '''
         if self.listed:
             # TODO: change this to a list subtype
-            instance._fields[self.name] = self.listed()
+            instance._fields[self._name] = self.listed()
         
         elif self.subfield:
-            instance._fields[self.name] = self.subfield()
+            instance._fields[self._name] = self.subfield()
         
         else:
-            instance._fields[self.name] = None
+            instance._fields[self._name] = None
             
 
 class _AutoMapperMixin:
     ''' Inject a control OrderedDict for the fields.
     '''
+    # The fields themselves live in _fields, so instances don't need a
+    # __dict__. Note that the AutoMapper metaclass gives every class empty
+    # __slots__ unless it declares its own.
+    __slots__ = ('_fields',)
     
     def __init__(self, *args, **kwargs):
-        # This is an awkward but effective way of initializing everything.
-        # Create self._fields, the ordereddict equivalent of self.__dict__
-        self._fields = collections.OrderedDict()
-        # For each field, delete it, resulting in the descriptor performing an
-        # initialization to its null state
-        for field in self.fields:
-            delattr(self, field)
+        # Create self._fields, the ordereddict equivalent of self.__dict__,
+        # with every field in its null state. This is what deleting each
+        # field would do, without dispatching through the descriptors.
+        self._fields = collections.OrderedDict(
+            (field, None if factory is None else factory())
+            for field, factory in self._null_template
+        )
             
-        # Now, we need to assign whatever was included in *args and **kwargs.
-        # First bind the signature.
-        bound_args = self._signature.bind_partial(*args, **kwargs)
-        # Now pop *args and **kwargs from it, defaulting to empty collections
-        args = bound_args.arguments.pop('args', tuple())
-        kwargs = bound_args.arguments.pop('kwargs', {})
-        # Now actually assign the remaining everything.
-        for name, value in bound_args.arguments.items():
-            setattr(self, name, value)
+        # Now, we need to assign whatever was included in *args and **kwargs,
+        # keeping anything that wasn't a field for the super() call.
+        args, kwargs = self._bind_fields(*args, **kwargs)
         
         # Yeah, don't forget this, but we need to wait until remapping *args
         # and **kwargs in the binding process above.
@@ -293,12 +691,10 @@ class _AutoMapperMixin:
         '''
         transcoded = collections.OrderedDict()
         
-        cls = type(self)
-        for field in self.fields:
-            descriptor = getattr(cls, field)
-            value = self._fields[field]
+        values = self._fields
+        for field, descriptor in self._descriptors:
             # Note that the descriptor handles nested fields and Nones
-            transcoded[field] = descriptor.encode(value)
+            transcoded[field] = descriptor.encode(values[field])
             
         return transcoded
         
@@ -306,60 +702,134 @@ class _AutoMapperMixin:
         ''' Apply the natively deserialized ordereddict into
         self._fields.
         '''
-        cls = type(self)
+        values = self._fields
+        if data is None:
+            data = {}
         
-        for field in self.fields:
-            descriptor = getattr(cls, field)
-            
+        for field, descriptor in self._descriptors:
             # Make sure we can optionally support configs with incomplete data
-            if data is None or field not in data:
+            if field not in data:
                 logger.warning('Healed config w/ missing field: ' + field)
                 
             else:
                 try:
                     # Note that the descriptor handles nested fields
-                    self._fields[field] = descriptor.decode(data[field])
+                    values[field] = descriptor.decode(data[field])
                     
                 except Exception as exc:
                     raise ConfigError('Failed to decode field: ' +
                                       field) from exc
                     
+    def _clone_fields(self):
+        ''' Create a copy of self._fields that shares no mutable state
+        with it. This is a stripped-down deepcopy: leaf values are all
+        immutable, so only subfields and lists thereof are duplicated.
+        '''
+        clone = collections.OrderedDict()
+        
+        values = self._fields
+        for field, descriptor in self._descriptors:
+            value = values[field]
+            
+            if descriptor.subfield is None:
+                if descriptor.listed:
+                    value = descriptor.listed(value)
+            
+            # Subfields (and their list items) may be None, just like when
+            # decoding, in which case there's nothing to clone.
+            elif descriptor.listed:
+                value = descriptor.listed(
+                    item if item is None else item._clone() for item in value
+                )
+            
+            elif value is not None:
+                value = value._clone()
+                
+            clone[field] = value
+            
+        return clone
+        
+    def _clone(self):
+        ''' Create an independent copy of self, bypassing __init__.
+        '''
+        clone = object.__new__(type(self))
+        clone._fields = self._clone_fields()
+        return clone
+        
     def __repr__(self):
         ''' Wrap in nice handling of fields.
         '''
-        rep = type(self).__name__ + '('
-        for field in self.fields:
-            rep += field + '=' + repr(getattr(self, field)) + ', '
-        rep = rep[:-2] + ')'
-        return rep
+        values = self._fields
+        return (
+            type(self).__name__ + '(' +
+            ', '.join(field + '=' + repr(values[field])
+                      for field in self.fields) +
+            ')'
+        )
             
     def __eq__(self, other):
         ''' Compare type of self and all fields.
         '''
+        if self is other:
+            return True
+        
         mycls = type(self)
         othercls = type(other)
         
-        comparator = True
-        if issubclass(mycls, othercls) or issubclass(othercls, mycls):
+        # Comparisons are almost always between instances of the same class,
+        # so skip walking the MROs if we can.
+        if mycls is othercls:
+            return self._fields == other._fields
+        
+        elif issubclass(mycls, othercls) or issubclass(othercls, mycls):
+            # Ordered dict comparison checks every field in a single pass.
             try:
-                comparator &= (self._fields == other._fields)
+                return self._fields == other._fields
             
             except AttributeError as exc:
                 raise TypeError(other) from exc
             
         else:
-            comparator &= False
-            
-        return comparator
+            return NotImplemented
         
     # Restore normal hashing
     __hash__ = object.__hash__
 
 
+# Sentinel for AutoMapper fields that weren't passed to __init__
+_UNBOUND = object()
+
+
+def _make_field_binder(clsname, fields):
+    ''' Generate a function that assigns any fields passed to it as args
+    or kwargs to an AutoMapper instance, returning whatever *args and
+    **kwargs were left over. This lets python do the argument binding
+    itself, instead of going through inspect.Signature.bind_partial.
+    '''
+    params = ''.join(field + '=_UNBOUND, ' for field in fields)
+    source = ['def _bind_fields(self, ' + params + '*args, **kwargs):']
+    for field in fields:
+        source.append('    if ' + field + ' is not _UNBOUND:')
+        source.append('        self.' + field + ' = ' + field)
+    source.append('    return args, kwargs')
+    
+    namespace = {'_UNBOUND': _UNBOUND}
+    exec('\n'.join(source), namespace)
+    binder = namespace['_bind_fields']
+    binder.__qualname__ = clsname + '._bind_fields'
+    return binder
+
+
 class _AutoMapper(type):
     ''' Metaclass used for automatically mapping a structured something
     into objects with properties and names and stuff.
     '''
+    
+    # These would collide with the attributes we add to the class
+    RESERVED_NAMES = frozenset(
+        {'fields', '_fields', '_descriptors', '_null_template',
+         '_bind_fields', 'self', 'args', 'kwargs'}
+    )
 
     # Remember the order of class variable definitions!
     @classmethod
@@ -368,53 +838,55 @@ class _AutoMapper(type):
 
     def __new__(mcls, clsname, bases, namespace, **kwargs):
         fields = []
-        parameters = []
+        descriptors = []
         for name, value in namespace.items():
-            if name in {'fields', '_fields', '_signature', 'args', 'kwargs'}:
+            if name in mcls.RESERVED_NAMES:
                 raise ValueError('Invalid class variable name for ' +
                                  'AutoMapper: ' + name)
             elif isinstance(value, AutoField):
                 fields.append(name)
+                descriptors.append((name, value))
                 # This will be ignored if the AutoField explicitly specifies
                 # the name to use.
                 value.name = name
-                # We want to be able to pass instance creation into the
-                # automapper fields, so let's make a parameter for it
-                parameters.append(
-                    inspect.Parameter(
-                        name = name,
-                        kind = inspect.Parameter.POSITIONAL_OR_KEYWORD
-                    )
-                )
-        
-        # We also want to support inheritance; so do this to add *args and
-        # **kwargs to the signature
-        parameters.append(
-            inspect.Parameter(
-                name = 'args',
-                kind = inspect.Parameter.VAR_POSITIONAL
-            )
-        )
-        parameters.append(
-            inspect.Parameter(
-                name = 'kwargs',
-                kind = inspect.Parameter.VAR_KEYWORD
-            )
-        )
         
         # Carry on then...
         bases = (_AutoMapperMixin, *bases)
-        cls = super().__new__(mcls, clsname, bases, dict(namespace), **kwargs)
-        cls.fields = fields
-        # This signature is for aforementioned binding
-        cls._signature = inspect.Signature(parameters)
+        namespace = dict(namespace)
+        namespace.setdefault('__slots__', ())
+        cls = super().__new__(mcls, clsname, bases, namespace, **kwargs)
+        # Fields are fixed once the class exists, so freeze them as a tuple
+        cls.fields = tuple(fields)
+        # Pair every field with its descriptor up front, so that transcoding
+        # doesn't need to look them up on the class every time.
+        cls._descriptors = tuple(descriptors)
+        # Likewise, decide once how to create each field's null state.
+        cls._null_template = tuple(
+            (name, descriptor.listed or descriptor.subfield)
+            for name, descriptor in descriptors
+        )
+        # We want to be able to pass instance creation into the automapper
+        # fields, but also support inheritance, so this binds the fields and
+        # hands back any other *args and **kwargs.
+        cls._bind_fields = _make_field_binder(clsname, fields)
         return cls
         
         
+def _intern_host(host):
+    ''' Intern host if it's a str, so that index_remote's comparisons
+    can short-circuit on identity. Anything else is passed through
+    untouched, since sys.intern would reject it.
+    '''
+    if type(host) is str:
+        return sys.intern(host)
+    else:
+        return host
+        
+        
 class Remote(metaclass=_AutoMapper):
     ''' How _RemoteDef should be.
     '''
-    host = AutoField()
+    host = AutoField(decode=_intern_host)
     port = AutoField()
     tls = AutoField()
 
@@ -474,6 +946,26 @@ class Config(metaclass=_AutoMapper):
     TARGET_FNAME = 'hypergolix.yml'
     OLD_FNAMES = {'hgx-cfg.json'}
     
+    __slots__ = ('path', '_cfg_cache', 'force_rewrite', 'coerce_name',
+                 '_remote_index')
+    
+    # Relative paths in here are relative to the config file itself, and are
+    # only joined onto it when a default is actually applied.
+    _DEFAULTS = (
+        ('process', (
+            ('ghidcache', pathlib.PurePath('ghidcache')),
+            ('logdir', pathlib.PurePath('logs')),
+            ('pid_file', pathlib.PurePath('hypergolix.pid')),
+            ('ipc_port', 7772),
+        )),
+        ('server', (
+            ('ghidcache', pathlib.PurePath('ghidcache')),
+            ('logdir', pathlib.PurePath('logs')),
+            ('pid_file', pathlib.PurePath('hgx-server.pid')),
+            ('port', 7770),
+        )),
+    )
+    
     def __init__(self, path, *args, **kwargs):
         ''' The usual init thing!
         '''
@@ -484,23 +976,8 @@ class Config(metaclass=_AutoMapper):
         self._cfg_cache = None
         self.force_rewrite = False
         self.coerce_name = False
-        
-        # Set defaults here so that the paths can be relative to the config
-        root = self.path.parent
-        self.defaults = {
-            'process': {
-                'ghidcache': root / 'ghidcache',
-                'logdir': root / 'logs',
-                'pid_file': root / 'hypergolix.pid',
-                'ipc_port': 7772
-            },
-            'server': {
-                'ghidcache': root / 'ghidcache',
-                'logdir': root / 'logs',
-                'pid_file': root / 'hgx-server.pid',
-                'port': 7770
-            }
-        }
+        # Lookup: (host, port) -> index in self.remotes. Lazily (re)built.
+        self._remote_index = {}
     
     def __enter__(self):
         ''' Gets a configuration for hypergolix (if one exists), and
@@ -508,7 +985,7 @@ class Config(metaclass=_AutoMapper):
         is available.
         '''
         # Cache the existing configuration so we can check for changes
-        self._cfg_cache = copy.deepcopy(self)
+        self._cfg_cache = self._clone_fields()
         # Coerce any defaults, which will force a new config to do a rewrite
         # upon __exit__, since we now differ from _cfg_cache
         self.coerce_defaults()
@@ -523,7 +1000,7 @@ class Config(metaclass=_AutoMapper):
         # Only modify if there were no errors; never do a partial update.
         if exc_type is None:
             # Perform an update if forced, or if the config has changed
-            if self.force_rewrite or self._cfg_cache != self:
+            if self.force_rewrite or self._cfg_cache != self._fields:
                 logger.debug('Dumping config to file.')
                 self.dump(self.path)
                 self.force_rewrite = False
@@ -537,7 +1014,7 @@ class Config(metaclass=_AutoMapper):
                 
                 # Rename the old path, updating its location on disk, and then
                 # update self.path accordingly
-                old_path.rename(new_path)
+                _rename_cfg(old_path, new_path)
                 self.path = new_path
                 
                 # Reset name coercion if successful
@@ -546,16 +1023,31 @@ class Config(metaclass=_AutoMapper):
         # Reset the config cache (it's just wasting memory now)
         self._cfg_cache = None
         
+    @property
+    def defaults(self):
+        ''' The default values for this config, with any relative paths
+        made relative to the config file.
+        '''
+        root = self.path.parent
+        return {
+            subfield: {
+                attr: _anchor_default(root, default)
+                for attr, default in defaults
+            }
+            for subfield, defaults in self._DEFAULTS
+        }
+        
     def coerce_defaults(self):
         ''' Finds any null fields and converts them to a default value.
         '''
-        for subfield, defaults in self.defaults.items():
+        root = self.path.parent
+        for subfield, defaults in self._DEFAULTS:
             # Get the actual subfield instead of just its name
             subfield = getattr(self, subfield)
             # Now for that subfield, apply defaults
-            for attr, default in defaults.items():
+            for attr, default in defaults:
                 if getattr(subfield, attr) is None:
-                    setattr(subfield, attr, default)
+                    setattr(subfield, attr, _anchor_default(root, default))
         
     @classmethod
     def find(cls):
@@ -579,27 +1071,33 @@ class Config(metaclass=_AutoMapper):
             default = '/qdubuddfsyvfafhlqcqetfkokykqeulsguoasnzjkc'
         )
         
-        search_order = []
-        search_order.append(pathlib.Path(envpath))
-        search_order.append(pathlib.Path('.').absolute())
-        search_order.append(pathlib.Path.home() / '.hypergolix')
-        # It really doesn't matter if we do this on Windows too, since it'll
-        # just not exist.
-        search_order.append(pathlib.Path('/etc/hypergolix'))
-        search_order.append(pathlib.Path(appdatapath) / 'Hypergolix')
-        
-        # Collapse the nested loop into a single for loop with a list comp
-        fnames = {cls.TARGET_FNAME, *cls.OLD_FNAMES}
-        fpaths = (dirpath / fname for dirpath in search_order
-                  for fname in fnames)
-        # Check all of those paths
-        for fpath in fpaths:
-            if fpath.exists():
-                break
-        # Not found; raise.
-        else:
-            raise ConfigMissing()
+        search_order = _search_order(
+            envpath,
+            appdatapath,
+            os.getcwd(),
+            os.path.expanduser('~')
+        )
+        
+        fnames = (cls.TARGET_FNAME, *sorted(cls.OLD_FNAMES))
+        fpath = _FIND_CACHE.get(search_order)
+        # Reuse the last result for this search order to skip everything
+        # after it. But it may have gone away since then (for example, if
+        # its name was coerced), and a config may have appeared somewhere
+        # that takes precedence over it, so re-check everything before it.
+        if fpath is not None:
+            fpath = _find_cfg(
+                search_order[:search_order.index(fpath.parent) + 1],
+                fnames
+            )
+            
+        if fpath is None:
+            fpath = _find_cfg(search_order, fnames)
+            
+            # Not found; raise.
+            if fpath is None:
+                raise ConfigMissing()
         
+        _FIND_CACHE[search_order] = fpath
         self = cls.load(fpath)
         # If it's a deprecated filename, coerce it to the new one.
         if fpath.name in cls.OLD_FNAMES:
@@ -620,36 +1118,31 @@ class Config(metaclass=_AutoMapper):
     def load(cls, path):
         ''' Load a config from a pathlib.Path.
         '''
-        cfg_txt = path.read_text()
+        raw_cfg = _read_cfg(path)
         self = cls(path)
-        self.decode(cfg_txt)
+        self.detranscode(raw_cfg)
         
         return self
         
     def dump(self, path):
         ''' Dump a config to a pathlib.Path.
         '''
-        path.write_text(self.encode())
+        _write_cfg(path, self.entranscode())
         
     def reload(self):
         ''' Reload an existing config.
         '''
-        cfg_txt = self.path.read_text()
-        self.decode(cfg_txt)
+        self.detranscode(_read_cfg(self.path))
     
     def encode(self):
         ''' Converts the config into an encoded file ready for output.
         '''
-        raw_cfg = self.entranscode()
-        return yaml.dump(raw_cfg, default_flow_style=False)
+        return _serialize_cfg(self.entranscode())
         
     def decode(self, data):
         ''' Load an existing config.
-        
-        NOTE: json is valid yaml. This will correctly load old configs
-        without any extra effort!
         '''
-        raw_cfg = yaml.safe_load(data)
+        raw_cfg = _parse_cfg(data)
         self.detranscode(raw_cfg)
             
     def set_remote(self, host, port, tls=True):
@@ -657,7 +1150,7 @@ class Config(metaclass=_AutoMapper):
         our config. Will also update TLS configuration of existing
         remotes.
         '''
-        rdef = Remote(host, port, tls)
+        rdef = Remote(_intern_host(host), port, tls)
         
         if rdef == NAMED_REMOTES['hgx']:
             # TODO: move this somewhere else? This is a bit of an awkward place
@@ -674,6 +1167,7 @@ class Config(metaclass=_AutoMapper):
         # This is a new remote.
         if index is None:
             self.remotes.append(rdef)
+            self._remote_index[(rdef.host, rdef.port)] = len(self.remotes) - 1
             
         # This is an existing remote. Update in-place
         else:
@@ -684,31 +1178,43 @@ class Config(metaclass=_AutoMapper):
         not exist in the config.
         '''
         # TLS does not matter when removing stuff.
-        rdef = Remote(host, port, False)
+        rdef = Remote(_intern_host(host), port, False)
         index = self.index_remote(rdef)
         
         if index is None:
             return None
         else:
+            # Everything after the removed remote shifts down, so let the
+            # index rebuild itself on the next lookup.
+            self._remote_index.clear()
             return self.remotes.pop(index)
         
     def index_remote(self, remote):
         ''' Find the index of an existing remote, if it exists. Ignores
         the remote's TLS configuration.
         '''
-        remote2 = copy.deepcopy(remote)
-        remote2.tls = not remote.tls
-        
-        try:
-            index = self.remotes.index(remote)
-        except ValueError:
-            try:
-                index = self.remotes.index(remote2)
-            except ValueError:
-                return None
-        
-        # If we get here, one of the above was successful.
-        return index
+        key = (remote.host, remote.port)
+        remotes = self.remotes
+        
+        # The remotes list can also be modified directly (or replaced, when
+        # reloading), so only trust the index if it still points at a remote
+        # with the right (host, port).
+        index = self._remote_index.get(key)
+        if index is not None and index < len(remotes):
+            existing = remotes[index]
+            if existing is not None and (existing.host, existing.port) == key:
+                return index
+        
+        # Stale or missing; rebuild the whole thing in a single pass. Use the
+        # first occurrence of any duplicates, same as a linear search would.
+        # Configs may also contain null remotes, which never match anything.
+        self._remote_index = remote_index = {}
+        for index, existing in enumerate(remotes):
+            if existing is not None:
+                remote_index.setdefault((existing.host, existing.port), index)
+        
+        # Still might not find it.
+        return remote_index.get(key)
 
 
 # ###############################################
@@ -717,14 +1223,36 @@ class Config(metaclass=_AutoMapper):
 
 
 NAMED_REMOTES = {
-    'hgx': Remote('hgx.hypergolix.com', 443, True)
+    'hgx': Remote(sys.intern('hgx.hypergolix.com'), 443, True)
+}
+
+
+# Lookup: CLI verbosity name -> configured log level
+VERBOSITY_LEVELS = {
+    'extreme': 'extreme',
+    'shouty': 'shouty',
+    'louder': 'debug',
+    'loud': 'info',
+    'normal': 'warning',
+    'quiet': 'error',
+    'error': 'error',
+    'warning': 'warning',
+    'info': 'info',
+    'debug': 'debug'
 }
 
 
 def _named_remote(remote):
-    ''' Converts a named remote to a host, port, TLS group.
+    ''' Converts a named remote to a host, port, TLS group, with a
+    useful error if it doesn't exist.
     '''
-    return NAMED_REMOTES[remote]
+    result = NAMED_REMOTES.get(remote)
+    
+    if result is None:
+        raise ValueError('Unknown named remote: ' + repr(remote) + '. ' +
+                         'Known remotes: ' + ', '.join(sorted(NAMED_REMOTES)))
+    else:
+        return result
 
 
 def _exclusive_named_remote(remote):
@@ -745,19 +1273,7 @@ def _handle_verbosity(config, verbosity):
         warnings.warn('Modifying Hypergolix configuration through CLI is ' +
                       'deprecated. Please edit the hypergolix.yml config ' +
                       'file instead.', DeprecationWarning, stacklevel=10)
-        lookup = {
-            'extreme': 'extreme',
-            'shouty': 'shouty',
-            'louder': 'debug',
-            'loud': 'info',
-            'normal': 'warning',
-            'quiet': 'error',
-            'error': 'error',
-            'warning': 'warning',
-            'info': 'info',
-            'debug': 'debug'
-        }
-        config.instrumentation.verbosity = lookup[verbosity]
+        config.instrumentation.verbosity = VERBOSITY_LEVELS[verbosity]
 
 
 def _handle_debug(config, debug_enabled):
@@ -781,20 +1297,26 @@ def _handle_debug(config, debug_enabled):
 def _handle_remotes(config, only_remotes, add_remotes, remove_remotes):
     ''' Manages remotes.
     '''
-    if ((only_remotes is not None) | bool(add_remotes) | bool(remove_remotes)):
-        warnings.warn('Modifying Hypergolix configuration through CLI is ' +
-                      'deprecated. Please edit the hypergolix.yml config ' +
-                      'file instead.', DeprecationWarning, stacklevel=10)
+    # Most invocations don't touch the remotes at all, so bail early.
+    if only_remotes is None and not add_remotes and not remove_remotes:
+        return
+    
+    warnings.warn('Modifying Hypergolix configuration through CLI is ' +
+                  'deprecated. Please edit the hypergolix.yml config ' +
+                  'file instead.', DeprecationWarning, stacklevel=10)
+    
+    set_remote = config.set_remote
     
     # Handling an exclusive remote declaration
     if only_remotes is not None:
-        # Remove all existing remotes
-        for remote in config.remotes:
-            config.remove_remote(remote.host, remote.port)
+        # Remove all existing remotes in one go. Note that removing them one
+        # at a time while iterating over the live list would skip every other
+        # remote.
+        config.remotes.clear()
         
         # Do nothing for local only, but add in the named remote otherwise
         for remote in only_remotes:
-            config.set_remote(
+            set_remote(
                 remote.host,
                 remote.port,
                 remote.tls
@@ -803,91 +1325,96 @@ def _handle_remotes(config, only_remotes, add_remotes, remove_remotes):
     # Adding and removing remotes normally.
     else:
         for remote in add_remotes:
-            config.set_remote(
+            set_remote(
                 remote.host,
                 remote.port,
                 remote.tls
             )
+        remove_remote = config.remove_remote
         for remote in remove_remotes:
-            config.remove_remote(
+            remove_remote(
                 remote.host,
                 remote.port
             )
 
 
 def _typecast_remotes(args):
-    ''' Performs all type checking and casting for remotes.
+    ''' Performs all type checking and casting for the --only remote.
+    Everything else was already cast to a Remote while parsing; see
+    convert_remote.
     '''
-    # First enforce "only" actually being ONLY
-    if args.only_remotes is not None and args.add_remotes:
-        raise ValueError('Cannot use --only with --add or --remove.')
-    elif args.only_remotes is not None and args.remove_remotes:
-        raise ValueError('Cannot use --only with --add or --remove.')
+    # Not using an only named remote; the common case, so check it first.
+    if args.only_remotes is None:
+        return
         
-    # Correctly defined, and we're not using an only named remote.
-    elif args.only_remotes is None:
-        _process_remotes(args.add_remotes)
-        _process_remotes(args.remove_remotes)
+    # Enforce "only" actually being ONLY
+    elif args.add_remotes or args.remove_remotes:
+        raise ValueError('Cannot use --only with --add or --remove.')
         
     # We've specified a single named remote.
     elif args.only_remotes != 'local':
-        args.only_remotes = [NAMED_REMOTES[args.only_remotes]]
+        args.only_remotes = [_named_remote(args.only_remotes)]
         
     # We've specified only local.
     else:
         args.only_remotes = []
 
 
-def _process_remotes(remotes):
-    ''' Ensures correct definitions for all non-singular remotes, and
-    type casts them appropriately.
+def convert_remote(remote):
+    ''' Type casts a single remote definition into a Remote. The
+    definition is either the name of a named remote, or a (host, port)
+    or (host, port, tls) sequence of strs, exactly as argparse hands it
+    to us. Raises ValueError if the definition is invalid.
     '''
-    re_remotes = []
-    for remote in remotes:
-        # This is a named remote. Easy peasy.
-        if isinstance(remote, str):
-            re_remotes.append(NAMED_REMOTES[remote])
+    # This is a named remote. Easy peasy.
+    if type(remote) is str:
+        return _named_remote(remote)
+        
+    # This is a manually-defined remote. We need to do some massaging.
+    else:
+        host = remote[0]
+        port = int(remote[1])
+        
+        # Calling add_remotes specifies TLS. Use it!
+        if len(remote) == 3:
+            tls = _str_to_bool(
+                remote[2],
+                failure_msg = 'Failed to infer truthiness of TLS usage. ' +
+                              'Please use "true", "false", "t", "f", etc.'
+            )
             
-        # This is a manually-defined remote. We need to do some massaging.
+        # Calling remove_remotes omits TLS. Fake it!
         else:
-            host = remote[0]
-            port = int(remote[1])
-            
-            # Calling add_remotes specifies TLS. Use it!
-            if len(remote) == 3:
-                tls = _str_to_bool(
-                    remote[2],
-                    failure_msg = 'Failed to infer truthiness of TLS usage. ' +
-                                  'Please use "true", "false", "t", "f", etc.'
-                )
-                
-            # Calling remove_remotes omits TLS. Fake it!
-            else:
-                tls = True
-            
-            # Now make a readonly remote for the definition.
-            re_remotes.append(Remote(host, port, tls))
-            
-    # And finally, update the original remotes in place.
-    remotes.clear()
-    remotes.extend(re_remotes)
+            tls = True
+        
+        # Now make a readonly remote for the definition.
+        return Remote(host, port, tls)
+
+
+_TRUTHINESS = {
+    'y': True,
+    'true': True,
+    't': True,
+    'yes': True,
+    '1': True,
+    'n': False,
+    'false': False,
+    'f': False,
+    'no': False,
+    '0': False,
+}
 
 
 def _str_to_bool(s, failure_msg='Failed to infer truthiness.'):
     ''' Attempts to convert a string to a bool.
     '''
     # Normalize case.
-    s = s.lower()
-    
-    truisms = {'y', 'true', 't', 'yes', '1'}
-    falsities = {'n', 'false', 'f', 'no', '0'}
+    result = _TRUTHINESS.get(s.lower())
     
-    if s in truisms:
-        return True
-    elif s in falsities:
-        return False
-    else:
+    if result is None:
         raise ValueError(failure_msg)
+    else:
+        return result
 
 
 def _handle_ipc(config, ipc):
@@ -906,13 +1433,10 @@ def _format_blockstr(long_line):
     shortened_length = 36
     indent = '    '
     
-    out = []
-    for slice_start in range(0, len(long_line), shortened_length):
-        out.append(
-            indent + long_line[slice_start:slice_start + shortened_length]
-        )
-    
-    return '\n'.join(out)
+    return '\n'.join(
+        indent + long_line[slice_start:slice_start + shortened_length]
+        for slice_start in range(0, len(long_line), shortened_length)
+    )
 
 
 def _handle_whoami(config, whoami):
@@ -952,9 +1476,16 @@ def _handle_register(config, register):
         reg_address = 'https://www.hypergolix.com/register.html?' + fingerprint
         
         try:
-            webbrowser.open(reg_address, new=2)
+            # Only the registration flow needs a browser; don't pay for the
+            # import anywhere else.
+            import webbrowser
+            # open returns False if no browser could be launched at all
+            opened = webbrowser.open(reg_address, new=2)
             
         except Exception:
+            opened = False
+            
+        if not opened:
             print(
                 'Failed to open web browser for registration.\n' +
                 'Please navigate to this address and click "register":\n' +
@@ -972,6 +1503,11 @@ def _handle_register(config, register):
 
 def handle_args(args):
     ''' Performs all needed actions on the passed command args.
+    
+    NOTE: args.add_remotes and args.remove_remotes must already hold
+    Remote instances (hypergolix.cli casts them while parsing; anything
+    else building args should do so with convert_remote). Only
+    args.only_remotes is still cast here.
     '''
     _typecast_remotes(args)
     
@@ -35,9 +35,9 @@ Some notes:
 
 # External deps
 import logging
+import collections
 import weakref
 import threading
-import traceback
 import inspect
 import asyncio
 
@@ -83,9 +83,17 @@ __all__ = [
 class GolixCore(metaclass=API):
     ''' Wrapper around Golix library that automates much of the state
     management, holds the Agent's identity, etc etc.
+    
+    Making and opening containers and bindings doesn't touch any shared
+    identity state (every call gets fresh cipher contexts, and the keys
+    themselves are safe to share between threads), so those run in the
+    executor without locking. Requests still serialize on a mutex, since
+    they go through the ECDH exchange.
     '''
     _librarian = weak_property('__librarian')
     DEFAULT_LEGROOM = 7
+    # How many unpacked SecondParties to keep around
+    SECONDPARTY_CACHE_SIZE = 256
     
     # Async stuff
     _executor = readonly_property('__executor')
@@ -102,10 +110,10 @@ class GolixCore(metaclass=API):
         '''
         super().__init__(*args, **kwargs)
         self._mutex_request = threading.Lock()
-        self._mutex_container = threading.Lock()
-        self._mutex_sbinding = threading.Lock()
-        self._mutex_dbinding = threading.Lock()
-        self._mutex_xbinding = threading.Lock()
+        
+        # Identities are immutable, so their unpacked SecondParty objects can
+        # be reused. Lookup: ghid -> SecondParty, in least-recently-used order
+        self._secondparties = collections.OrderedDict()
         
         # Added during bootstrap
         self.__identity = None
@@ -153,6 +161,29 @@ class GolixCore(metaclass=API):
         '''
         self.__identity = identity
         
+    async def _get_secondparty(self, ghid):
+        ''' Get the SecondParty for ghid, retrieving and unpacking its
+        identity only if we haven't done so recently. Raises KeyError if
+        the librarian doesn't know the ghid.
+        '''
+        secondparties = self._secondparties
+        
+        try:
+            secondparty = secondparties[ghid]
+            
+        except KeyError:
+            secondparty = SecondParty.from_packed(
+                await self._librarian.retrieve(ghid)
+            )
+            secondparties[ghid] = secondparty
+            if len(secondparties) > self.SECONDPARTY_CACHE_SIZE:
+                secondparties.popitem(last=False)
+                
+        else:
+            secondparties.move_to_end(ghid)
+            
+        return secondparty
+        
     @property
     @public_api
     def whoami(self):
@@ -192,9 +223,7 @@ class GolixCore(metaclass=API):
         Note that the request is UNPACKED, not packed.
         '''
         try:
-            requestor = SecondParty.from_packed(
-                await self._librarian.retrieve(unpacked.author)
-            )
+            requestor = await self._get_secondparty(unpacked.author)
             
         except KeyError as exc:
             raise UnknownParty(
@@ -213,9 +242,7 @@ class GolixCore(metaclass=API):
     async def open_request(self, unpacked):
         ''' Also bypass executor here.
         '''
-        requestor = SecondParty.from_packed(
-            await self._librarian.retrieve(unpacked.author)
-        )
+        requestor = await self._get_secondparty(unpacked.author)
         return self._open_request(unpacked, requestor)
         
     def _open_request(self, unpacked, requestor):
@@ -228,9 +255,7 @@ class GolixCore(metaclass=API):
     async def make_request(self, recipient, payload):
         # Just like it says on the label...
         try:
-            recipient = SecondParty.from_packed(
-                await self._librarian.retrieve(recipient)
-            )
+            recipient = await self._get_secondparty(recipient)
         except KeyError as exc:
             raise UnknownParty(
                 'Request author unknown: ' + str(recipient)
@@ -248,9 +273,7 @@ class GolixCore(metaclass=API):
     async def make_request(self, recipient, payload):
         ''' Bypass the goddamn executor. Ffs.
         '''
-        recipient = SecondParty.from_packed(
-            await self._librarian.retrieve(recipient)
-        )
+        recipient = await self._get_secondparty(recipient)
         return self._make_request(recipient, payload)
         
     def _make_request(self, recipient, payload):
@@ -263,9 +286,7 @@ class GolixCore(metaclass=API):
     
     @public_api
     async def open_container(self, container, secret):
-        author = SecondParty.from_packed(
-            await self._librarian.retrieve(container.author)
-        )
+        author = await self._get_secondparty(container.author)
         
         # Wrapper around golix.FirstParty.receive_container.
         # Run the actual function in the executor
@@ -281,20 +302,17 @@ class GolixCore(metaclass=API):
     async def open_container(self, container, secret):
         ''' Bypass executor for fixture.
         '''
-        author = SecondParty.from_packed(
-            await self._librarian.retrieve(container.author)
-        )
+        author = await self._get_secondparty(container.author)
         
         return self._open_container(container, secret, author)
         
     def _open_container(self, container, secret, author):
         # Wrapper around golix.FirstParty.receive_container.
-        with self._mutex_container:
-            return self._identity.receive_container(
-                author = author,
-                secret = secret,
-                container = container
-            )
+        return self._identity.receive_container(
+            author = author,
+            secret = secret,
+            container = container
+        )
     
     @public_api
     async def make_container(self, data, secret):
@@ -315,11 +333,10 @@ class GolixCore(metaclass=API):
         
     def _make_container(self, data, secret):
         # Simple wrapper around golix.FirstParty.make_container
-        with self._mutex_container:
-            return self._identity.make_container(
-                secret = secret,
-                plaintext = data
-            )
+        return self._identity.make_container(
+            secret = secret,
+            plaintext = data
+        )
 
     @public_api
     async def make_binding_stat(self, target):
@@ -341,8 +358,7 @@ class GolixCore(metaclass=API):
     def _make_binding_stat(self, target):
         # Note that this requires no open() method, as bindings are verified by
         # the local persister.
-        with self._mutex_sbinding:
-            return self._identity.make_bind_static(target)
+        return self._identity.make_bind_static(target)
     
     @public_api
     async def make_binding_dyn(self, target, ghid=None, history=None):
@@ -393,12 +409,11 @@ class GolixCore(metaclass=API):
         else:
             target_vector = [target]
         
-        with self._mutex_dbinding:
-            return self._identity.make_bind_dynamic(
-                counter = counter,
-                target_vector = target_vector,
-                ghid_dynamic = ghid
-            )
+        return self._identity.make_bind_dynamic(
+            counter = counter,
+            target_vector = target_vector,
+            ghid_dynamic = ghid
+        )
     
     @public_api
     async def make_debinding(self, target):
@@ -418,22 +433,38 @@ class GolixCore(metaclass=API):
         
     def _make_debinding(self, target):
         # Simple wrapper around golix.FirstParty.make_debind
-        with self._mutex_xbinding:
-            return self._identity.make_debind(target)
+        return self._identity.make_debind(target)
 
 
 class GhidProxier(metaclass=API):
     ''' Resolve the base container GHID from any associated ghid. Uses
     all weak references, so should not interfere with GCing objects.
     '''
-    # Note that we can't really cache aliases, because their proxies will
-    # not update when we change things unless the proxy is also removed
-    # from the cache. Since the objects may (or may not) exist locally in
-    # memory anyways, we should just take advantage of that, and allow our
-    # inquisitor to more easily manage memory consumption as well.
+    # Note that aliases can change what they resolve to whenever a new
+    # dynamic frame arrives, so resolved aliases are only remembered until
+    # the librarian's generation changes (ie, until anything is stored or
+    # abandoned there).
+    # Containers, on the other hand, always resolve to themselves, so those
+    # are safe to remember (up to a point).
+    _CONTAINER_CACHE_SIZE = 4096
+    _ALIAS_CACHE_SIZE = 4096
+    # How many proxies we'll follow before assuming there's a cycle
+    _MAX_DEPTH = 64
     _librarian = weak_property('__librarian')
     
-    @fixture_api
+    @public_api
+    def __init__(self, *args, **kwargs):
+        ''' Set up the container cache.
+        '''
+        super().__init__(*args, **kwargs)
+        # Lookup: container ghid -> None, in least-recently-used order
+        self._containers = collections.OrderedDict()
+        # Lookup: alias ghid -> container ghid, in least-recently-used order,
+        # valid only for the librarian generation it was resolved in
+        self._aliases = collections.OrderedDict()
+        self._aliases_generation = None
+    
+    @__init__.fixture
     def __init__(self, *args, **kwargs):
         ''' Add in a dict to store resolutions.
         '''
@@ -463,13 +494,11 @@ class GhidProxier(metaclass=API):
     
     @public_api
     async def resolve(self, ghid):
-        ''' Protect the entry point with a global lock, but don't leave
-        the recursive bit alone.
+        ''' Resolve the container ghid for ghid, following at most
+        _MAX_DEPTH proxies before raising RecursionError.
         
         TODO: make this guarantee, through using the persister's
         librarian, that the resolved ghid IS, in fact, a container.
-        
-        TODO: consider adding a depth limit to resolution.
         '''
         if not isinstance(ghid, Ghid):
             raise TypeError('Can only resolve a ghid.')
@@ -477,31 +506,62 @@ class GhidProxier(metaclass=API):
         return (await self._resolve(ghid))
         
     async def _resolve(self, ghid):
-        ''' Recursively resolves the container ghid for a proxy (or a
-        container).
-        '''
-        try:
-            obj = await self._librarian.summarize(ghid)
-        
-        # TODO: make this an error?
-        except KeyError:
-            logger.warning(''.join((
-                'GAO ',
-                str(ghid),
-                ' address resolver failed to verify: missing at librarian.\n',
-                traceback.format_exc()
-            )))
+        ''' Resolves the container ghid for a proxy (or a container),
+        walking the chain of proxies one link at a time.
+        '''
+        containers = self._containers
+        librarian = self._librarian
+        
+        # Any stores or abandons since we last looked could have changed where
+        # our aliases point, so start over if so.
+        aliases = self._aliases
+        generation = librarian.generation
+        if generation != self._aliases_generation:
+            aliases.clear()
+            self._aliases_generation = generation
+            
+        elif ghid in aliases:
+            aliases.move_to_end(ghid)
+            return aliases[ghid]
+        
+        alias = ghid
+        for __ in range(self._MAX_DEPTH):
+            if ghid in containers:
+                containers.move_to_end(ghid)
+                break
+            
+            try:
+                obj = await librarian.summarize(ghid)
+            
+            # TODO: make this an error?
+            except KeyError:
+                logger.warning(
+                    'GAO ' + str(ghid) + ' address resolver failed to ' +
+                    'verify: missing at librarian.',
+                    exc_info=True
+                )
+                return ghid
             
-            result = ghid
-        
-        else:
             if isinstance(obj, _GeocLite):
-                result = ghid
+                containers[ghid] = None
+                if len(containers) > self._CONTAINER_CACHE_SIZE:
+                    containers.popitem(last=False)
+                break
                 
-            else:
-                result = await self._resolve(obj.target)
-                
-        return result
+            ghid = obj.target
+            
+        else:
+            raise RecursionError(
+                'Exceeded maximum proxy depth while resolving ' + str(alias)
+            )
+        
+        # Only remember the alias if nothing changed while we were walking.
+        if alias != ghid and librarian.generation == generation:
+            aliases[alias] = ghid
+            if len(aliases) > self._ALIAS_CACHE_SIZE:
+                aliases.popitem(last=False)
+        
+        return ghid
         
     @resolve.fixture
     async def resolve(self, ghid):
@@ -531,17 +591,47 @@ class Oracle(metaclass=API):
     _percore = weak_property('__percore')
     _librarian = weak_property('__librarian')
     
+    # How many objects to hold strong references to
+    _LOOKUP_MAX = 4096
+    
     def __init__(self, *args, **kwargs):
         ''' Sets up internal tracking.
         '''
         super().__init__(*args, **kwargs)
-        self._lookup = {}
+        # Lookup: ghid -> obj, in least-recently-used order
+        self._lookup = collections.OrderedDict()
+        # Objects that fell out of the lookup, but might still be alive
+        # elsewhere. We must never create a second GAO for any of these.
+        self._evicted = weakref.WeakValueDictionary()
         
     @fixture_api
     def RESET(self):
         ''' Simply re-call init.
         '''
         self._lookup.clear()
+        self._evicted.clear()
+        
+    def _remember(self, ghid, obj):
+        ''' Add obj to the lookup as its most recently used object. If
+        that puts us over capacity, demote the least recently used one
+        to a weak reference, so that it can be GC'd (and reloaded later)
+        unless someone else is still using it.
+        '''
+        lookup = self._lookup
+        lookup[ghid] = obj
+        lookup.move_to_end(ghid)
+        
+        if len(lookup) > self._LOOKUP_MAX:
+            evicted_ghid, evicted = lookup.popitem(last=False)
+            self._evicted[evicted_ghid] = evicted
+            
+    def _forget(self, ghid):
+        ''' Remove the ghid from both the lookup and the evicted objects.
+        Returns True if it was in either one.
+        '''
+        found = self._lookup.pop(ghid, None) is not None
+        found |= self._evicted.pop(ghid, None) is not None
+        return found
         
     def assemble(self, golcore, ghidproxy, privateer, percore, librarian,
                  salmonator):
@@ -563,17 +653,23 @@ class Oracle(metaclass=API):
     async def get_object(self, gaoclass, ghid, *args, **kwargs):
         ''' Get an object.
         '''
+        # If the object was evicted, but is still alive, bring it back.
+        obj = self._evicted.pop(ghid, None)
+        if obj is not None:
+            self._remember(ghid, obj)
+        
         if ghid in self._lookup:
             # TODO: this is bad, because we're suppresing any potential argsig
             # problems. We should fix the abstraction so that it doesn't break
             # assumptions like that.
             obj = self._lookup[ghid]
+            self._lookup.move_to_end(ghid)
             logger.debug(
                 'GAO ' + str(ghid) + ' already exists in Oracle memory as: ' +
                 str(type(obj))
             )
             
-            if not isinstance(obj, gaoclass):
+            if type(obj) is not gaoclass and not isinstance(obj, gaoclass):
                 raise TypeError(
                     'Object has already been resolved, and is not the '
                     'correct GAO class.'
@@ -584,7 +680,7 @@ class Oracle(metaclass=API):
                 )
                 
             await obj._ctx.wait()
-            if ghid not in self._lookup:
+            if ghid not in self:
                 raise RuntimeError('Contentious delete while getting object.')
         
         else:
@@ -594,6 +690,9 @@ class Oracle(metaclass=API):
                 str(gaoclass)
             )
             
+            # Resolve the weak properties once, instead of at every use.
+            salmonator = self._salmonator
+            
             # First create the actual GAO. We do not need to have the ghid
             # downloaded to do this -- object creation is just making a Python
             # object locally.
@@ -616,16 +715,15 @@ class Oracle(metaclass=API):
             
             # Always do this first to make sure we have the most recent version
             # in all subsequent calls, without a race condition.
-            self._lookup[ghid] = obj
+            self._remember(ghid, obj)
             
             try:
                 # Now immediately subscribe to the object upstream, so that there
                 # is no race condition getting updates
-                await self._salmonator.register(ghid)
+                await salmonator.register(ghid)
                 # Add deregister as a finalizer, but don't call it atexit. TODO:
                 # fix leaky abstraction
-                finalizer = weakref.finalize(obj, self._salmonator._deregister,
-                                             ghid)
+                finalizer = weakref.finalize(obj, salmonator._deregister, ghid)
                 finalizer.atexit = False
                 # Explicitly pull the object from salmonator to ensure we have
                 # the newest version, and that it is available locally in
@@ -633,7 +731,7 @@ class Oracle(metaclass=API):
                 # salmonator handles modal switching for dynamic/static. It
                 # will also (by default, with skip_refresh=False) pull in any
                 # updates that have accumulated in the meantime.
-                await self._salmonator.attempt_pull(ghid, quiet=True)
+                await salmonator.attempt_pull(ghid, quiet=True)
                 
                 # Now actually fetch the object. This may KeyError if the
                 # ghid is still unknown.
@@ -641,7 +739,7 @@ class Oracle(metaclass=API):
             
             # Got an exception? Revert the lookup and reraise
             except Exception:
-                del self._lookup[ghid]
+                self._forget(ghid)
                 raise
                 
             # We have to release other waiters regardless
@@ -679,13 +777,17 @@ class Oracle(metaclass=API):
         the declared gao_class. Requires a zeroth state, and calls push
         internally.
         '''
+        # Resolve the weak properties once, instead of at every use.
+        golcore = self._golcore
+        salmonator = self._salmonator
+        
         obj = gaoclass(
             None,                   # ghid
             dynamic,
-            self._golcore.whoami,   # author
+            golcore.whoami,         # author
             legroom,
             *args,
-            golcore = self._golcore,
+            golcore = golcore,
             ghidproxy = self._ghidproxy,
             privateer = self._privateer,
             percore = self._percore,
@@ -698,15 +800,15 @@ class Oracle(metaclass=API):
         obj._ctx = asyncio.Event()
         obj._ctx.set()
         # Do this before registering with salmonator, in case the latter errors
-        self._lookup[obj.ghid] = obj
+        ghid = obj.ghid
+        self._remember(ghid, obj)
         
         # Finally, register to receive any concurrent updates from other
         # simultaneous sessions, and then return the object
-        await self._salmonator.register(obj.ghid)
+        await salmonator.register(ghid)
         # Add deregister as a finalizer, but don't call it atexit. TODO: fix
         # leaky abstraction
-        finalizer = weakref.finalize(obj, self._salmonator._deregister,
-                                     obj.ghid)
+        finalizer = weakref.finalize(obj, salmonator._deregister, ghid)
         finalizer.atexit = False
         
         return obj
@@ -742,9 +844,7 @@ class Oracle(metaclass=API):
         
         Indempotent; will not raise KeyError if called more than once.
         '''
-        try:
-            del self._lookup[ghid]
-        except KeyError:
+        if not self._forget(ghid):
             logger.debug(str(ghid) + ' unknown to oracle.')
             
     def __contains__(self, ghid):
@@ -752,4 +852,4 @@ class Oracle(metaclass=API):
         availability; that would require checking the persister for its
         existence and the privateer for access).
         '''
-        return ghid in self._lookup
+        return ghid in self._lookup or ghid in self._evicted
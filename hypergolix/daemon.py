@@ -542,8 +542,7 @@ def run_daemon(cfg_path, pid_file, parent_port, account_entity,
         # Convert paths to strs and make sure the dirs exist
         cache_dir = str(config.process.ghidcache)
         log_dir = str(config.process.logdir)
-        _ensure_dir_exists(config.process.ghidcache)
-        _ensure_dir_exists(config.process.logdir)
+        _ensure_dir_exists(config.process.ghidcache, config.process.logdir)
         
         debug = _default_to(config.instrumentation.debug, False)
         verbosity = _default_to(config.instrumentation.verbosity, 'info')
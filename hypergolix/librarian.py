@@ -139,6 +139,9 @@ class LibrarianCore(metaclass=API):
     _enforcer = weak_property('__enforcer')
     _lawyer = weak_property('__lawyer')
     _percore = weak_property('__percore')
+    # Bumped whenever anything is stored or abandoned, so that anything
+    # derived from our contents can cheaply tell when it might be stale.
+    generation = 0
     
     @public_api
     def __init__(self, *args, memory_cache=10000, **kwargs):
@@ -273,6 +276,7 @@ class LibrarianCore(metaclass=API):
             
         await self.add_to_cache(obj, data)
         self._catalog[reference_ghid] = obj
+        self.generation += 1
         
         # If successful (which is any time we get to here), we also need to get
         # rid of any old dynamic frames and pop them from the catalog.
@@ -331,6 +335,7 @@ class LibrarianCore(metaclass=API):
         
         # Delete it from the catalog (if it exists there)
         self._catalog.pop(ghid, None)
+        self.generation += 1
     
     # Subclasses MAY define this, but are not required to do so.
     @fixture_api
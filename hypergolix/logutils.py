@@ -72,8 +72,7 @@ def autoconfig(tofile=True, logdirname='logs', loglevel='warning', prefix='',
         # Convert the log directory to an absolute path
         logdir = pathlib.Path(logdirname).absolute()
 
-        if (not logdir.exists()) or (not logdir.is_dir()):
-            logdir.mkdir(parents=True)
+        logdir.mkdir(parents=True, exist_ok=True)
             
         logpath = _make_logpath(
             root = logdir,
@@ -280,8 +280,7 @@ def start(namespace=None):
         #####################
         
     config = Config.load(config_path)
-    _ensure_dir_exists(config.server.ghidcache)
-    _ensure_dir_exists(config.server.logdir)
+    _ensure_dir_exists(config.server.ghidcache, config.server.logdir)
     
     debug = _default_to(config.server.debug, False)
     verbosity = _default_to(config.server.verbosity, 'info')
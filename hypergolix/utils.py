@@ -1763,16 +1763,24 @@ def _default_to(check, default, comparator=None):
             return check
 
 
-def _ensure_dir_exists(path):
-    ''' Ensures the existence of a directory. Path must be to the dir,
-    and not to a file therewithin.
+def _ensure_dir_exists(*paths):
+    ''' Ensures the existence of one or more directories. Paths must be
+    to the dirs, and not to files therewithin.
     '''
-    path = pathlib.Path(path).absolute()
-    if not path.exists():
-        path.mkdir(parents=True)
-        
-    elif not path.is_dir():
-        raise FileExistsError('Path exists already and is not a directory.')
+    for path in paths:
+        path = pathlib.Path(path).absolute()
+        # Note that exist_ok only suppresses the error if the existing path is
+        # a directory, so this covers both cases without a separate stat. The
+        # parents are only walked if the immediate mkdir fails with ENOENT, so
+        # siblings sharing an existing parent (like logs and ghidcache) cost a
+        # single mkdir apiece.
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            
+        except FileExistsError as exc:
+            raise FileExistsError(
+                'Path exists already and is not a directory.'
+            ) from exc
 
 
 def ensure_equal_len(iterable, msg=''):
@@ -69,11 +69,11 @@ def make_fixtures(debug, hgx_root_1, hgx_root_2):
     
     with Config(hgx_root_1) as config:
         config.set_remote('127.0.0.1', server_port, False)
-        config.ipc_port = 6023
+        config.process.ipc_port = 6023
         
     with Config(hgx_root_2) as config:
         config.set_remote('127.0.0.1', server_port, False)
-        config.ipc_port = 6024
+        config.process.ipc_port = 6024
         
     hgxserver = _hgx_server(
         host = '127.0.0.1',
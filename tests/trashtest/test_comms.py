@@ -0,0 +1,243 @@
+'''
+Scratchpad for test-based development.
+
+LICENSING
+-------------------------------------------------
+
+hypergolix: A python Golix client.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+
+'''
+
+import unittest
+import asyncio
+
+from loopa import NoopLoop
+from loopa.utils import await_coroutine_threadsafe
+
+from hypergolix.comms import RequestResponseProtocol
+from hypergolix.comms import request
+from hypergolix.comms import _RequestToken
+
+
+# ###############################################
+# Testing fixtures
+# ###############################################
+
+
+class _Echo(metaclass=RequestResponseProtocol,
+            error_codes={b'\x00\x01': ValueError}):
+    ''' Bare-bones request/response protocol.
+    '''
+    
+    @request(b'EC')
+    async def echo(self, connection, msg):
+        return msg
+        
+    @echo.request_handler
+    async def echo(self, connection, body):
+        return body
+
+
+class _Loopback:
+    ''' Connection that delivers everything it sends straight back to
+    its peer's protocol.
+    '''
+    
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self.peer = None
+        
+    async def send(self, msg):
+        asyncio.ensure_future(self.peer.protocol(self.peer, msg))
+
+
+class _Blackhole:
+    ''' Connection that swallows everything it sends, remembering it so
+    that tests can respond whenever they want.
+    '''
+    
+    def __init__(self):
+        self.sent = []
+        
+    async def send(self, msg):
+        self.sent.append(msg)
+
+
+# ###############################################
+# Testing
+# ###############################################
+
+
+class RequestTokenTest(unittest.TestCase):
+    ''' Test delivery of responses to the futures reserved alongside
+    their request tokens.
+    '''
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.nooploop = NoopLoop(
+            debug = True,
+            threaded = True
+        )
+        cls.nooploop.start()
+        
+    @classmethod
+    def tearDownClass(cls):
+        # Kill the running loop.
+        cls.nooploop.stop_threadsafe_nowait()
+        
+    def setUp(self):
+        self.protocol = _Echo()
+        
+    def _run(self, coro):
+        return await_coroutine_threadsafe(
+            coro = coro,
+            loop = self.nooploop._loop
+        )
+        
+    async def _respond(self, connection, body=b'late'):
+        ''' Send a success response to the last request on connection.
+        Returns its token.
+        '''
+        __, token, __ = await self.protocol.unpackit(connection.sent[-1])
+        response = await self.protocol.packit(
+            self.protocol._SUCCESS_CODE,
+            token,
+            body
+        )
+        await self.protocol(connection, response)
+        return token
+        
+    def test_roundtrip(self):
+        ''' Concurrent requests each get their own response, and leave
+        no tokens behind.
+        '''
+        conn1 = _Loopback(self.protocol)
+        conn2 = _Loopback(_Echo())
+        conn1.peer = conn2
+        conn2.peer = conn1
+        
+        async def make_requests():
+            return await asyncio.gather(*(
+                self.protocol.echo(conn1, bytes([i]) * 3)
+                for i in range(20)
+            ))
+            
+        self.assertEqual(
+            self._run(make_requests()),
+            [bytes([i]) * 3 for i in range(20)]
+        )
+        self.assertEqual(self.protocol._responses[conn1], {})
+        
+    def test_timeout(self):
+        ''' A timed-out request frees its token, and a response arriving
+        afterwards is dropped.
+        '''
+        conn = _Blackhole()
+        
+        with self.assertRaises(asyncio.TimeoutError):
+            self._run(self.protocol.echo(conn, b'hello', timeout=.01))
+            
+        self.assertEqual(len(conn.sent), 1)
+        self.assertEqual(self.protocol._responses[conn], {})
+        
+        # This must not raise (nor resurrect the token)
+        self._run(self._respond(conn))
+        self.assertEqual(self.protocol._responses[conn], {})
+        
+    def test_cancelled(self):
+        ''' A response arriving after the requestor was cancelled finds
+        its future already done, and is dropped without error.
+        '''
+        conn = _Blackhole()
+        
+        async def cancel_then_respond():
+            task = asyncio.ensure_future(self.protocol.echo(conn, b'hello'))
+            while not conn.sent:
+                await asyncio.sleep(0)
+                
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+                
+            __, token, __ = await self.protocol.unpackit(conn.sent[-1])
+            waiter = self.protocol._responses[conn][token]
+            self.assertTrue(waiter.done())
+            
+            return (await self._respond(conn))
+            
+        token = self._run(cancel_then_respond())
+        self.assertNotIn(token, self.protocol._responses[conn])
+        
+    def test_unknown_token(self):
+        ''' Responses to tokens we never issued are dropped.
+        '''
+        conn = _Blackhole()
+        conn.sent.append(self._run(
+            self.protocol.packit(b'EC', _RequestToken(1234), b'')
+        ))
+        self._run(self._respond(conn))
+        self.assertEqual(self.protocol._responses[conn], {})
+        
+    def test_failure(self):
+        ''' Failure responses still wake the requestor, with the error.
+        '''
+        conn = _Blackhole()
+        
+        async def request_then_fail():
+            task = asyncio.ensure_future(self.protocol.echo(conn, b'hello'))
+            while not conn.sent:
+                await asyncio.sleep(0)
+                
+            __, token, __ = await self.protocol.unpackit(conn.sent[-1])
+            response = await self.protocol.packit(
+                self.protocol._FAILURE_CODE,
+                token,
+                self.protocol._pack_failure(ValueError('nope'))
+            )
+            await self.protocol(conn, response)
+            return (await task)
+            
+        with self.assertRaises(ValueError):
+            self._run(request_then_fail())
+        self.assertEqual(self.protocol._responses[conn], {})
+        
+    def test_failure_bodies(self):
+        ''' Equal, but differently-printed, exception args must each get
+        their own message.
+        '''
+        for arg in (1, True, 1.0):
+            with self.subTest(arg):
+                body = self.protocol._pack_failure(ValueError(arg))
+                self.assertTrue(body.endswith(str(arg).encode('utf-8')))
+
+
+if __name__ == "__main__":
+    unittest.main()
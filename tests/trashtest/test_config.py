@@ -32,6 +32,7 @@ hypergolix: A python Golix client.
 '''
 
 import unittest
+import unittest.mock
 import json
 import tempfile
 import pathlib
@@ -46,11 +47,15 @@ from hypergolix.config import Remote
 from hypergolix.config import User
 from hypergolix.config import Instrumentation
 from hypergolix.config import Process
+from hypergolix.config import _CFG_CACHE
+from hypergolix.config import _atomic_write
+from hypergolix.config import _parse_cfg
 
 from hypergolix.utils import _ensure_dir_exists
 
 from hypergolix.cli import main as ingest_args
 from hypergolix.config import handle_args
+from hypergolix.config import convert_remote
 
 from hypergolix.exceptions import ConfigError
 
@@ -299,6 +304,44 @@ class ConfigTest(unittest.TestCase):
             finally:
                 del os.environ['HYPERGOLIX_HOME']
     
+    def test_find_cfg_precedence(self):
+        ''' Ensure configs that appear after a find, but take precedence
+        over its result, are picked up by the next one.
+        '''
+        with tempfile.TemporaryDirectory() as root:
+            root = pathlib.Path(root)
+            envdir = root / 'env'
+            cwd = root / 'cwd'
+            envdir.mkdir()
+            cwd.mkdir()
+            os.environ['HYPERGOLIX_HOME'] = str(envdir)
+            
+            try:
+                with unittest.mock.patch(
+                    'hypergolix.config.os.getcwd',
+                    return_value = str(cwd)
+                ):
+                    # Earlier directory in the search order
+                    (cwd / 'hypergolix.yml').touch()
+                    self.assertEqual(Config.find().path,
+                                     cwd / 'hypergolix.yml')
+                    (envdir / 'hgx-cfg.json').touch()
+                    self.assertEqual(Config.find().path,
+                                     envdir / 'hgx-cfg.json')
+                    
+                    # Preferred name in the same directory
+                    (envdir / 'hypergolix.yml').touch()
+                    self.assertEqual(Config.find().path,
+                                     envdir / 'hypergolix.yml')
+                    
+                    # And falling back once it's gone
+                    (envdir / 'hypergolix.yml').unlink()
+                    (envdir / 'hgx-cfg.json').unlink()
+                    self.assertEqual(Config.find().path,
+                                     cwd / 'hypergolix.yml')
+            finally:
+                del os.environ['HYPERGOLIX_HOME']
+    
     @unittest.skip('Appdata superceded by local hgx on dev machines.')
     def test_find_cfg_from_appdata(self):
         with tempfile.TemporaryDirectory() as root:
@@ -353,6 +396,15 @@ class ConfigTest(unittest.TestCase):
             _ensure_dir_exists(nest2)
             self.assertTrue(nest1.exists())
             self.assertTrue(nest2.exists())
+            
+            batch1 = root / 't4' / 'b1'
+            batch2 = root / 't4' / 'b2'
+            _ensure_dir_exists(batch1, batch2, nest1)
+            self.assertTrue(batch1.is_dir())
+            self.assertTrue(batch2.is_dir())
+            
+            with self.assertRaises(FileExistsError):
+                _ensure_dir_exists(root / 't5', innocent)
         
     def test_manipulate_remotes(self):
         config = Config(pathlib.Path())
@@ -384,6 +436,44 @@ class ConfigTest(unittest.TestCase):
         self.assertEqual(config.index_remote(rem1), 0)
         self.assertIsNone(config.index_remote(rem2))
         self.assertEqual(config.index_remote(rem3), 1)
+        
+        # Direct modification of the remotes must not confuse the index
+        config.remotes.insert(0, rem2a)
+        self.assertEqual(config.index_remote(rem1), 1)
+        self.assertEqual(config.index_remote(rem2), 0)
+        self.assertEqual(config.index_remote(rem3), 2)
+        config.remotes.clear()
+        self.assertIsNone(config.index_remote(rem1))
+        
+        # Non-str hosts can't be interned, but are still allowed
+        config.set_remote(1234, 123)
+        self.assertEqual(config.index_remote(Remote(1234, 123, True)), 0)
+        config.remove_remote(1234, 123)
+        self.assertEqual(config.remotes, [])
+        
+        config.decode('remotes:\n- host: 1234\n  port: 123\n  tls: true\n')
+        self.assertEqual(config.remotes, [Remote(1234, 123, True)])
+    
+    def test_convert_remote(self):
+        ''' Ensure remote definitions, as argparse produces them, are
+        correctly cast.
+        '''
+        self.assertEqual(
+            convert_remote('hgx'),
+            Remote('hgx.hypergolix.com', 443, True)
+        )
+        self.assertEqual(
+            convert_remote(['host1', '123', 'f']),
+            Remote('host1', 123, False)
+        )
+        self.assertEqual(
+            convert_remote(['host1', '123']),
+            Remote('host1', 123, True)
+        )
+        
+        for bad_def in ('nope', ['host1', 'port'], ['host1', '123', 'eh']):
+            with self.subTest(bad_def), self.assertRaises(ValueError):
+                convert_remote(bad_def)
     
     def test_context(self):
         ''' Ensure the context manager results in an update when changes
@@ -410,6 +500,186 @@ class ConfigTest(unittest.TestCase):
                 
             other_cfg.reload()
             self.assertEqual(config, other_cfg)
+            
+    def test_context_nulls(self):
+        ''' Ensure configs with empty sections, or null remotes, still
+        work with the context manager.
+        '''
+        null_cfgs = [
+            'user:\ninstrumentation:\n',
+            'remotes:\n- null\n',
+        ]
+        
+        for null_cfg in null_cfgs:
+            with self.subTest(null_cfg), \
+                    tempfile.TemporaryDirectory() as root:
+                path = pathlib.Path(root) / 'hypergolix.yml'
+                path.write_text(null_cfg)
+                
+                config = Config.load(path)
+                with config:
+                    config.set_remote('host1', 123)
+                    config.set_remote('host1', 123, False)
+                    config.remove_remote('host2', 123)
+                    
+                other_cfg = Config.load(path)
+                self.assertEqual(config, other_cfg)
+    
+    def test_parse(self):
+        ''' Ensure both json and yaml parse, and that yaml doesn't pay
+        for a failed json parse first.
+        '''
+        expected = {'process': {'ipc_port': 7772}}
+        self.assertEqual(
+            _parse_cfg('\n  {"process": {"ipc_port": 7772}}'),
+            expected
+        )
+        # Yaml flow mappings look like json, but aren't
+        self.assertEqual(_parse_cfg('{process: {ipc_port: 7772}}'), expected)
+        
+        with unittest.mock.patch(
+            'hypergolix.config._json_loads',
+            side_effect = AssertionError('Json parser used for yaml.')
+        ):
+            self.assertEqual(
+                _parse_cfg('process:\n  ipc_port: 7772\n'),
+                expected
+            )
+        
+    def test_load_cache(self):
+        ''' Ensure repeated loads pick up changes to the file on disk.
+        '''
+        with tempfile.TemporaryDirectory() as root:
+            root = pathlib.Path(root)
+            path = pathlib.Path(root / 'hypergolix.yml')
+            
+            path.write_text(vec_cfg)
+            first = Config.load(path)
+            second = Config.load(path)
+            self.assertEqual(first, obj_cfg)
+            self.assertEqual(first, second)
+            
+            with second:
+                second.instrumentation.verbosity = 'debug'
+            
+            first.reload()
+            self.assertEqual(first, second)
+            # The atomic write shouldn't leave its tempfile lying around
+            self.assertEqual(
+                sorted(child.name for child in root.iterdir()),
+                [path.name, path.name + '.cache.json']
+            )
+            
+            # Pretend we're a new process, which must go through the sidecar
+            _CFG_CACHE.clear()
+            third = Config.load(path)
+            self.assertEqual(third, second)
+            
+            # Dumping an unchanged config shouldn't rewrite the file
+            mtime = path.stat().st_mtime_ns
+            first.dump(path)
+            self.assertEqual(path.stat().st_mtime_ns, mtime)
+            
+            # Sidestep dump() entirely, as though the file were hand-edited
+            path.write_text(vec_cfg)
+            first.reload()
+            self.assertEqual(first, obj_cfg)
+            
+    def test_load_cache_unsafe(self):
+        ''' Ensure configs that json can't represent still load, and are
+        simply never cached in the sidecar.
+        '''
+        unsafe_cfgs = [
+            'instrumentation:\n  traceur: 2020-01-01\n',
+            'instrumentation:\n  traceur: !!binary aGVsbG8=\n',
+            # Json would silently turn the int key into a str
+            'instrumentation:\n  traceur:\n    1: foo\n',
+        ]
+        
+        for unsafe_cfg in unsafe_cfgs:
+            with self.subTest(unsafe_cfg), \
+                    tempfile.TemporaryDirectory() as root:
+                root = pathlib.Path(root)
+                path = pathlib.Path(root / 'hypergolix.yml')
+                path.write_text(unsafe_cfg)
+                
+                first = Config.load(path)
+                self.assertEqual(
+                    [child.name for child in root.iterdir()],
+                    [path.name]
+                )
+                
+                # And it should still load when the memory cache is cold
+                _CFG_CACHE.clear()
+                second = Config.load(path)
+                self.assertEqual(first, second)
+                
+    def test_load_cache_sidecar(self):
+        ''' Ensure the sidecar is only as accessible as the config, is
+        only written when needed, and follows the config around.
+        '''
+        with tempfile.TemporaryDirectory() as root:
+            root = pathlib.Path(root)
+            path = root / 'hgx-cfg.json'
+            sidecar = root / (path.name + '.cache.json')
+            path.write_text(vec_cfg)
+            os.chmod(str(path), 0o640)
+            
+            config = Config.load(path)
+            if os.name == 'posix':
+                self.assertEqual(sidecar.stat().st_mode & 0o777, 0o640)
+            
+            # A fresh sidecar must not be rewritten by a (cold) load
+            sidecar_stat = sidecar.stat()
+            _CFG_CACHE.clear()
+            Config.load(path)
+            self.assertEqual(sidecar.stat(), sidecar_stat)
+            
+            config.coerce_name = True
+            with config:
+                pass
+            
+            self.assertEqual(config.path, root / Config.TARGET_FNAME)
+            self.assertEqual(
+                sorted(child.name for child in root.iterdir()),
+                [config.path.name, config.path.name + '.cache.json']
+            )
+            
+            # Configs that can't have a sidecar shouldn't keep an old one
+            config.path.write_text('instrumentation:\n  traceur: !!binary ' +
+                                   'aGVsbG8=\n')
+            Config.load(config.path)
+            self.assertEqual([child.name for child in root.iterdir()],
+                             [config.path.name])
+                
+    def test_atomic_write(self):
+        ''' Ensure atomic writes keep the existing file's permissions,
+        and clean up after themselves when they fail.
+        '''
+        with tempfile.TemporaryDirectory() as root:
+            root = pathlib.Path(root)
+            path = root / 'hypergolix.yml'
+            
+            _atomic_write(path, 'foo')
+            self.assertEqual(path.read_text(), 'foo')
+            if os.name == 'posix':
+                self.assertEqual(path.stat().st_mode & 0o777, 0o600)
+                os.chmod(str(path), 0o640)
+                
+            _atomic_write(path, 'bar')
+            self.assertEqual(path.read_text(), 'bar')
+            if os.name == 'posix':
+                self.assertEqual(path.stat().st_mode & 0o777, 0o640)
+            
+            with unittest.mock.patch(
+                'hypergolix.config.os.replace',
+                side_effect = OSError('nope')
+            ), self.assertRaises(OSError):
+                _atomic_write(path, 'baz')
+                
+            self.assertEqual(path.read_text(), 'bar')
+            self.assertEqual([child.name for child in root.iterdir()],
+                             [path.name])
                 
                 
 class CommandingTest(unittest.TestCase):
@@ -498,6 +768,8 @@ class CommandingTest(unittest.TestCase):
                 ('config -o local', normal),
                 ('config --only local', normal),
                 ('config -ah host1 123 t -ah host2 123 t', host1host2),
+                # Make sure --only clears out more than one existing remote
+                ('config --only local', normal),
             ]
             
             failing_commands = [
@@ -505,6 +777,8 @@ class CommandingTest(unittest.TestCase):
                 'config --verbosity XXXTREEEEEEEME',
                 'config --debug --no-debug',
                 'config -o local -a hgx',
+                'config -ah host1 123 maybe',
+                'config -rh host1 notaport',
             ]
             
             for cmd_str, cmd_result in valid_commands:
@@ -35,6 +35,8 @@ hypergolix: A python Golix client.
 
 import unittest
 import concurrent.futures
+import weakref
+import gc
 
 from loopa import NoopLoop
 from loopa.utils import await_coroutine_threadsafe
@@ -53,6 +55,7 @@ from hypergolix.librarian import LibrarianCore
 from hypergolix.persistence import _GidcLite
 from hypergolix.persistence import _GeocLite
 from hypergolix.persistence import _GobdLite
+from hypergolix.persistence import _GobsLite
 
 # These are fixture imports
 from golix import Ghid
@@ -68,6 +71,42 @@ from _fixtures.identities import TEST_AGENT2
 from _fixtures.ghidutils import make_random_ghid
 
 
+class _SummaryLibrarian:
+    ''' Bare-bones librarian standin that only knows how to summarize
+    and retrieve, and counts how many times it was asked to.
+    '''
+    generation = 0
+    
+    def __init__(self):
+        self.summaries = {}
+        self.calls = 0
+        self.data = {}
+        self.retrievals = 0
+        
+    async def summarize(self, ghid):
+        self.calls += 1
+        return self.summaries[ghid]
+        
+    async def retrieve(self, ghid):
+        self.retrievals += 1
+        return self.data[ghid]
+        
+    def add_container(self):
+        ''' Make a container and return its ghid.
+        '''
+        ghid = make_random_ghid()
+        self.summaries[ghid] = _GeocLite(ghid, TEST_AGENT1.ghid)
+        return ghid
+        
+    def add_proxy(self, target, ghid=None):
+        ''' Make a proxy to target and return its ghid.
+        '''
+        if ghid is None:
+            ghid = make_random_ghid()
+        self.summaries[ghid] = _GobsLite(ghid, TEST_AGENT1.ghid, target)
+        return ghid
+
+
 # ###############################################
 # Testing
 # ###############################################
@@ -196,6 +235,54 @@ class GolcoreTest(unittest.TestCase):
             coro = self.golcore.make_debinding(target=dynamic2.ghid_dynamic),
             loop = self.nooploop._loop
         )
+        
+    def test_secondparty_cache(self):
+        ''' Test the SecondParty LRU: hits skip the librarian, and the
+        least recently used party is evicted at capacity.
+        '''
+        librarian = _SummaryLibrarian()
+        golcore = GolixCore.__fixture__(TEST_AGENT1, librarian=librarian)
+        golcore.SECONDPARTY_CACHE_SIZE = 2
+        
+        # Identities are immutable, so any ghid can share the packed data
+        ghid1 = make_random_ghid()
+        ghid2 = make_random_ghid()
+        ghid3 = make_random_ghid()
+        for ghid in (ghid1, ghid2, ghid3):
+            librarian.data[ghid] = TEST_AGENT2.second_party.packed
+            
+        def get(ghid):
+            return await_coroutine_threadsafe(
+                coro = golcore._get_secondparty(ghid),
+                loop = self.nooploop._loop
+            )
+        
+        party1 = get(ghid1)
+        self.assertEqual(party1.ghid, TEST_AGENT2.ghid)
+        self.assertIs(get(ghid1), party1)
+        self.assertEqual(librarian.retrievals, 1)
+        
+        # Fill past capacity, touching ghid1 again so that ghid2 is the least
+        # recently used one
+        get(ghid2)
+        get(ghid1)
+        get(ghid3)
+        self.assertEqual(librarian.retrievals, 3)
+        self.assertEqual(list(golcore._secondparties), [ghid1, ghid3])
+        
+        # Cached parties don't go back to the librarian, even if it has
+        # since forgotten them
+        del librarian.data[ghid1]
+        self.assertIs(get(ghid1), party1)
+        self.assertEqual(librarian.retrievals, 3)
+        
+        # But evicted ones do
+        get(ghid2)
+        self.assertEqual(librarian.retrievals, 4)
+        
+        # And unknown ones still raise
+        with self.assertRaises(KeyError):
+            get(make_random_ghid())
 
         
 class GhidproxyTest(unittest.TestCase):
@@ -312,6 +399,156 @@ class GhidproxyTest(unittest.TestCase):
             cont2_2.ghid
         )
 
+    def _resolve(self, ghid):
+        ''' Shorthand for a threadsafe resolve.
+        '''
+        return await_coroutine_threadsafe(
+            coro = self.ghidproxy.resolve(ghid),
+            loop = self.nooploop._loop
+        )
+        
+    def test_container_cache(self):
+        ''' Test the container LRU: hits skip the librarian, eviction
+        happens at capacity, and evicted containers are looked up anew.
+        '''
+        librarian = _SummaryLibrarian()
+        self.ghidproxy.assemble(librarian)
+        self.ghidproxy._CONTAINER_CACHE_SIZE = 2
+        container1 = librarian.add_container()
+        container2 = librarian.add_container()
+        container3 = librarian.add_container()
+        
+        self.assertEqual(self._resolve(container1), container1)
+        self.assertEqual(self._resolve(container1), container1)
+        self.assertEqual(librarian.calls, 1)
+        
+        # Proxies to known containers stop walking once they reach one
+        proxy = librarian.add_proxy(container1)
+        self.assertEqual(self._resolve(proxy), container1)
+        self.assertEqual(librarian.calls, 2)
+        
+        self._resolve(container2)
+        self._resolve(container1)
+        self._resolve(container3)
+        self.assertEqual(
+            list(self.ghidproxy._containers),
+            [container1, container3]
+        )
+        
+        calls = librarian.calls
+        self._resolve(container2)
+        self.assertEqual(librarian.calls, calls + 1)
+        
+        # Containers can never be retargeted, so a cached one resolves to
+        # itself even once the librarian has lost track of it -- which is
+        # exactly what an uncached, missing ghid resolves to as well.
+        del librarian.summaries[container2]
+        self.assertEqual(self._resolve(container2), container2)
+        self.assertEqual(librarian.calls, calls + 1)
+        
+    def test_cycle(self):
+        ''' Test that proxy cycles and overly deep chains are caught
+        instead of recursing forever.
+        '''
+        librarian = _SummaryLibrarian()
+        self.ghidproxy.assemble(librarian)
+        
+        # A -> B -> A
+        ghid_a = make_random_ghid()
+        ghid_b = librarian.add_proxy(ghid_a)
+        librarian.add_proxy(ghid_b, ghid=ghid_a)
+        with self.assertRaises(RecursionError):
+            self._resolve(ghid_a)
+        
+        # Self-referencing
+        ghid_c = make_random_ghid()
+        librarian.add_proxy(ghid_c, ghid=ghid_c)
+        with self.assertRaises(RecursionError):
+            self._resolve(ghid_c)
+        
+        # Acyclic, but too deep
+        ghid = librarian.add_container()
+        for __ in range(self.ghidproxy._MAX_DEPTH):
+            ghid = librarian.add_proxy(ghid)
+        with self.assertRaises(RecursionError):
+            self._resolve(ghid)
+            
+        # And the longest allowable chain still resolves
+        container = librarian.add_container()
+        ghid = container
+        for __ in range(self.ghidproxy._MAX_DEPTH - 1):
+            ghid = librarian.add_proxy(ghid)
+        self.assertEqual(self._resolve(ghid), container)
+
+    def test_alias_cache(self):
+        ''' Test that resolved aliases are remembered, but never outlive
+        a change at the librarian.
+        '''
+        from _fixtures.remote_exchanges import cont1_1
+        geoc1_1 = _GeocLite(cont1_1.ghid, cont1_1.author)
+        from _fixtures.remote_exchanges import cont1_2
+        geoc1_2 = _GeocLite(cont1_2.ghid, cont1_2.author)
+        from _fixtures.remote_exchanges import dyn1_1a
+        gobd1_a = _GobdLite.from_golix(dyn1_1a)
+        from _fixtures.remote_exchanges import dyn1_1b
+        gobd1_b = _GobdLite.from_golix(dyn1_1b)
+        dyn_ghid = dyn1_1a.ghid_dynamic
+        
+        for obj, packed in ((geoc1_1, cont1_1.packed),
+                            (geoc1_2, cont1_2.packed),
+                            (gobd1_a, dyn1_1a.packed)):
+            await_coroutine_threadsafe(
+                coro = self.librarian.store(obj, packed),
+                loop = self.nooploop._loop
+            )
+        
+        self.assertEqual(self._resolve(dyn_ghid), cont1_1.ghid)
+        self.assertEqual(self.ghidproxy._aliases[dyn_ghid], cont1_1.ghid)
+        
+        # Storing a new frame must not be answered from the cache
+        await_coroutine_threadsafe(
+            coro = self.librarian.store(gobd1_b, dyn1_1b.packed),
+            loop = self.nooploop._loop
+        )
+        self.assertEqual(self._resolve(dyn_ghid), cont1_2.ghid)
+        self.assertEqual(self.ghidproxy._aliases[dyn_ghid], cont1_2.ghid)
+        
+        # Nor may abandoning it. With the frame gone, the dynamic ghid no
+        # longer resolves to anything but itself.
+        await_coroutine_threadsafe(
+            coro = self.librarian.abandon(gobd1_b),
+            loop = self.nooploop._loop
+        )
+        self.assertEqual(self._resolve(dyn_ghid), dyn_ghid)
+        self.assertNotIn(dyn_ghid, self.ghidproxy._aliases)
+        
+    def test_alias_cache_hits(self):
+        ''' Test that cached aliases skip the librarian entirely until
+        its generation changes.
+        '''
+        librarian = _SummaryLibrarian()
+        self.ghidproxy.assemble(librarian)
+        container = librarian.add_container()
+        proxy = librarian.add_proxy(librarian.add_proxy(container))
+        
+        self.assertEqual(self._resolve(proxy), container)
+        calls = librarian.calls
+        self.assertEqual(self._resolve(proxy), container)
+        self.assertEqual(librarian.calls, calls)
+        
+        # Retarget the chain behind the proxier's back
+        container2 = librarian.add_container()
+        librarian.add_proxy(container2, ghid=proxy)
+        librarian.generation += 1
+        self.assertEqual(self._resolve(proxy), container2)
+        self.assertGreater(librarian.calls, calls)
+        
+        # And with a small enough cache, older aliases are evicted
+        self.ghidproxy._ALIAS_CACHE_SIZE = 1
+        proxy2 = librarian.add_proxy(container)
+        self.assertEqual(self._resolve(proxy2), container)
+        self.assertEqual(list(self.ghidproxy._aliases), [proxy2])
+
         
 class OracleTest(unittest.TestCase):
     
@@ -397,6 +634,67 @@ class OracleTest(unittest.TestCase):
         )
         self.assertTrue(obj is obj2)
         
+    def _get(self, ghid):
+        ''' Shorthand for a threadsafe get_object.
+        '''
+        return await_coroutine_threadsafe(
+            coro = self.oracle.get_object(
+                gaoclass = GAOCore.__fixture__,
+                ghid = ghid
+            ),
+            loop = self.nooploop._loop
+        )
+        
+    def test_lru(self):
+        ''' Test the bounded lookup, including demotion of evicted
+        objects to weak references and their revival.
+        '''
+        self.oracle._LOOKUP_MAX = 2
+        ghid1 = make_random_ghid()
+        ghid2 = make_random_ghid()
+        ghid3 = make_random_ghid()
+        
+        obj1 = self._get(ghid1)
+        obj2 = self._get(ghid2)
+        obj3 = self._get(ghid3)     # noqa: F841 -- keep it alive
+        
+        # The least recently used object gets demoted, but not forgotten
+        self.assertEqual(len(self.oracle._lookup), 2)
+        self.assertNotIn(ghid1, self.oracle._lookup)
+        self.assertIn(ghid1, self.oracle._evicted)
+        self.assertIn(ghid1, self.oracle)
+        
+        # Still referenced, so it must be revived instead of rebuilt...
+        self.assertIs(self._get(ghid1), obj1)
+        self.assertIn(ghid1, self.oracle._lookup)
+        self.assertNotIn(ghid1, self.oracle._evicted)
+        # ...which in turn demotes the next least recently used one
+        self.assertNotIn(ghid2, self.oracle._lookup)
+        self.assertIn(ghid2, self.oracle._evicted)
+        
+        # Hits must also count as use
+        self._get(ghid3)
+        self._get(ghid1)
+        self.assertEqual(list(self.oracle._lookup), [ghid3, ghid1])
+        
+        # Once nobody else is using an evicted object, it can be collected
+        obj2_ref = weakref.ref(obj2)
+        del obj2
+        gc.collect()
+        self.assertIsNone(obj2_ref())
+        self.assertNotIn(ghid2, self.oracle)
+        
+        # And then gets rebuilt from scratch
+        obj2 = self._get(ghid2)
+        self.assertEqual(obj2.ghid, ghid2)
+        self.assertIn(ghid2, self.oracle._lookup)
+        self.assertLessEqual(len(self.oracle._lookup), 2)
+        
+        # Forgetting covers evicted objects too
+        self.assertIn(ghid3, self.oracle._evicted)
+        self.oracle.forget(ghid3)
+        self.assertNotIn(ghid3, self.oracle)
+        
 
 if __name__ == "__main__":
     from hypergolix import logutils